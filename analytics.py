@@ -0,0 +1,100 @@
+import sys
+import time
+import sqlite3
+import argparse
+import statistics
+from pathlib import Path
+from datetime import datetime
+
+from app.config import Config
+from app.const.group import TZ
+from app.population_rollup import (
+    daily_summary,
+    hourly_peaks,
+    rebuild_rollups,
+    top_share,
+)
+
+WEEKDAYS = "月火水木金土日"
+
+
+def local(ts: int) -> datetime:
+    return datetime.fromtimestamp(ts, TZ)
+
+
+def report_daily(conn: sqlite3.Connection, start: int, end: int) -> None:
+    print("日付        インスタンス数  最小  最大  平均")
+    for bucket, count, lo, hi, mean in daily_summary(conn, start, end):
+        print(
+            f"{local(bucket).strftime('%Y-%m-%d')}  {count:14d}  {lo:4d}  {hi:4d}  {mean:5.1f}"
+        )
+
+
+def report_hourly(conn: sqlite3.Connection, start: int, end: int) -> None:
+    # 曜日・時間帯ごとに、最大インスタンスの人数の中央値を出す
+    peaks: dict[tuple[int, int], list[int]] = {}
+    for bucket, users in hourly_peaks(conn, start, end):
+        t = local(bucket)
+        peaks.setdefault((t.weekday(), t.hour), []).append(users)
+
+    print("時  " + "  ".join(f"{w:>3}" for w in WEEKDAYS))
+    for hour in range(24):
+        cells = []
+        for weekday in range(7):
+            values = peaks.get((weekday, hour))
+            cells.append(f"{statistics.median(values):4.0f}" if values else "   -")
+        print(f"{hour:2d}  " + " ".join(cells))
+
+
+def report_top(conn: sqlite3.Connection, start: int, end: int) -> None:
+    print("最大インスタンスだった割合")
+    for instance_id, name, tops, share in top_share(conn, start, end):
+        print(f"{share * 100:5.1f}%  {tops:6d} samples  {name}  ({instance_id})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="インスタンス人数の履歴レポート")
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=Config.history_db_path(),
+        help="履歴の保存先 (デフォルト: HISTORY_DB)",
+    )
+    parser.add_argument("--days", type=int, default=28, help="集計対象の日数")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("daily", help="日ごとの人数の最小・最大・平均")
+    sub.add_parser("hourly", help="曜日・時間帯ごとの最大人数(中央値)")
+    sub.add_parser("top", help="最大インスタンスだった時間の割合")
+    sub.add_parser("backfill", help="生データから集計を作り直す")
+    args = parser.parse_args()
+
+    if args.db is None:
+        print(
+            "HISTORY_DB が空のため履歴は保存されていません (--db で指定)",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    if not args.db.exists():
+        print(f"{args.db} が見つかりません", file=sys.stderr)
+        sys.exit(1)
+
+    started = time.perf_counter()
+    if args.command == "backfill":
+        conn = sqlite3.connect(args.db, timeout=30)
+        with conn:
+            count = rebuild_rollups(conn)
+        print(f"{count} samples aggregated")
+    else:
+        conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+        end = int(time.time())
+        start = end - args.days * 86400
+        {"daily": report_daily, "hourly": report_hourly, "top": report_top}[
+            args.command
+        ](conn, start, end)
+    conn.close()
+
+    print(f"({(time.perf_counter() - started) * 1000:.1f}ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import json
+import httpx
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from app.config import Config
+from app.model.instance.create import CreateInstanceConfig
+from app.util.async_http import AsyncHttpClient
+from app.util.auth import AuthManager
+from app.util.logger import debug_json
+from app.util.rate_limit import Priority, priority
+from app.util.singleflight import AsyncSingleFlight
+from app.util.response_cache import CachePolicy, ResponseCache, cache_key
+from app.model.snapshot import GroupInstanceSnapshot, InstanceSnapshot
+from app.model.vrchat import (
+    GroupPostInfo,
+    GroupRole,
+    UserInfo,
+    InstanceInfo,
+    WorldsInfo,
+)
+
+T = TypeVar("T")
+
+
+class AsyncVRChatAPI:
+    def __init__(
+        self,
+        http: AsyncHttpClient,
+        auth: AuthManager,
+        config: Config,
+        cache: Optional[ResponseCache] = None,
+    ) -> None:
+        self.http = http
+        self.auth = auth
+        self.config = config
+        self.cache = cache or ResponseCache.from_config(config)
+        # ワールドの応答には現在のインスタンス一覧が含まれるので古い値は返さない
+        self.world_cache = CachePolicy(config.world_cache_ttl)
+        self.roles_cache = CachePolicy(config.roles_cache_ttl, config.cache_stale)
+        self._revalidations: set[asyncio.Task] = set()
+        self._login_lock = asyncio.Lock()
+        self._login_generation = 0
+        self.flight = AsyncSingleFlight()
+
+    async def _relogin(self, generation: int) -> bool:
+        # 同時に複数の401を受けてもログインは1回だけ行う
+        async with self._login_lock:
+            if generation != self._login_generation:
+                return True
+            if not await asyncio.to_thread(self.auth.login):
+                return False
+            self._login_generation += 1
+            return True
+
+    async def _request_with_relogin(self, method: str, url: str, **kwargs):
+        generation = self._login_generation
+        try:
+            resp = await self.http.request(method, url, **kwargs)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 401:
+                logging.warning("認証エラー: 再ログインしてリトライ")
+                if not await self._relogin(generation):
+                    raise
+                return await self.http.request(method, url, **kwargs)
+            raise
+        self.auth.mark_verified()
+        return resp
+
+    async def _get(
+        self,
+        url: str,
+        parse: Callable[[Any], T],
+        params: Optional[dict] = None,
+        cache: Optional[CachePolicy] = None,
+        raw: bool = False,
+    ) -> T:
+        key = cache_key(url, params)
+
+        # 同時に実行された同じGETは1回の通信・パース結果を共有する
+        async def fetch() -> T:
+            resp = await self._request_with_relogin("GET", url, params=params)
+            if raw:
+                # 応答のbytesから直接モデルを生成する (中間のdictを作らない)
+                debug_json(resp.content)
+                return parse(resp.content)
+
+            data = json.loads(resp.content)
+            debug_json(data)
+            value = parse(data)
+            if cache is not None:
+                self.cache.put(key, data, value)
+            return value
+
+        if cache is not None and (hit := self.cache.get(key, cache, parse)):
+            value, stale = hit
+            if stale:
+                self._revalidate(key, fetch)
+            return value
+
+        return await self.flight.do(key, fetch)
+
+    def _revalidate(self, key: str, fetch: Callable[[], Awaitable[T]]) -> None:
+        # 古いキャッシュを返した場合は裏で取得し直す
+        if not self.cache.begin_refresh(key):
+            return
+
+        async def run() -> None:
+            try:
+                await self.flight.do(key, fetch)
+            except Exception as e:
+                logging.warning(f"⚠️ Failed to revalidate {key}: {e}")
+            finally:
+                self.cache.end_refresh(key)
+
+        task = asyncio.create_task(run())
+        self._revalidations.add(task)
+        task.add_done_callback(self._revalidations.discard)
+
+    async def get_user_info(self, user_id: str) -> UserInfo:
+        return await self._get(
+            f"{self.config.base_url}/users/{user_id}",
+            UserInfo.model_validate_json,
+            raw=True,
+        )
+
+    async def get_group_instances(self, group_id: str) -> list[GroupInstanceSnapshot]:
+        return await self._get(
+            f"{self.config.base_url}/groups/{group_id}/instances",
+            lambda data: [GroupInstanceSnapshot.from_json(gi) for gi in data],
+        )
+
+    async def get_group_roles(self, group_id: str) -> list[GroupRole]:
+        return await self._get(
+            f"{self.config.base_url}/groups/{group_id}/roles",
+            lambda data: [GroupRole(**gr) for gr in data],
+            cache=self.roles_cache,
+        )
+
+    async def get_instance_info(
+        self, world_id: str, instance_id: str
+    ) -> InstanceSnapshot:
+        return await self._get(
+            f"{self.config.base_url}/instances/{world_id}:{instance_id}",
+            InstanceSnapshot.from_json,
+        )
+
+    async def create_instance(self, instance: CreateInstanceConfig) -> InstanceInfo:
+        data = instance.model_dump(by_alias=True)
+        resp = await self._request_with_relogin(
+            "POST", f"{self.config.base_url}/instances", data=data
+        )
+        data = resp.json()
+        debug_json(data)
+        return InstanceInfo(**data)
+
+    async def close_instance(self, instance: InstanceSnapshot) -> InstanceInfo:
+        resp = await self._request_with_relogin(
+            "DELETE",
+            f"{self.config.base_url}/instances/{instance.world_id}:{instance.instance_id}",
+        )
+        data = resp.json()
+        debug_json(data)
+        return InstanceInfo(**data)
+
+    async def invite_myself(self, instance_info: InstanceSnapshot) -> dict:
+        with priority(Priority.HIGH):
+            resp = await self._request_with_relogin(
+                "POST",
+                f"{self.config.base_url}/invite/myself/to/{instance_info.world_id}:{instance_info.instance_id}",
+            )
+        return resp.json()
+
+    async def get_worlds(self, world_id: str) -> WorldsInfo:
+        return await self._get(
+            f"{self.config.base_url}/worlds/{world_id}",
+            WorldsInfo.model_validate,
+            cache=self.world_cache,
+        )
+
+    async def get_group_posts(
+        self,
+        group_id: str,
+        n_count: int = 60,
+        offset: int = 0,
+        public_only: bool = True,
+    ) -> list[GroupPostInfo]:
+        params = {"n": n_count, "offset": offset, "publicOnly": public_only}
+        return await self._get(
+            f"{self.config.base_url}/groups/{group_id}/posts",
+            lambda data: [GroupPostInfo(**gp) for gp in data["posts"]],
+            params=params,
+        )
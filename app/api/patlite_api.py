@@ -3,7 +3,7 @@ from dataclasses import dataclass
 from enum import IntEnum, StrEnum
 from typing import Optional
 
-from app.util.http import HttpClient
+from app.util.http import EndpointClass, HttpClient
 
 
 class LightPattern(IntEnum):
@@ -161,6 +161,7 @@ class PatliteAPI:
         resp = self.http.request(
             "GET",
             f"http://{self.ip_address}/api/control",
+            endpoint=EndpointClass.DEVICE,
             params=params,
             verify=False,
         )
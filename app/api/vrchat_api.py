@@ -1,30 +1,49 @@
 import logging
+import threading
 import json
 import requests
+from typing import Any, Callable, Optional, TypeVar
 
 from app.config import Config
 from app.model.instance.create import CreateInstanceConfig
 from app.util.http import HttpClient
 from app.util.auth import AuthManager
+from app.util.logger import debug_json
+from app.util.rate_limit import Priority, priority
+from app.util.singleflight import SingleFlight
+from app.util.response_cache import CachePolicy, ResponseCache, cache_key
+from app.model.snapshot import GroupInstanceSnapshot, InstanceSnapshot
 from app.model.vrchat import (
     GroupPostInfo,
     GroupRole,
     UserInfo,
-    GroupInstance,
     InstanceInfo,
     WorldsInfo,
 )
 
+T = TypeVar("T")
+
 
 class VRChatAPI:
-    def __init__(self, http: HttpClient, auth: AuthManager, config: Config) -> None:
+    def __init__(
+        self,
+        http: HttpClient,
+        auth: AuthManager,
+        config: Config,
+        cache: Optional[ResponseCache] = None,
+    ) -> None:
         self.http = http
         self.auth = auth
         self.config = config
+        self.cache = cache or ResponseCache.from_config(config)
+        # ワールドの応答には現在のインスタンス一覧が含まれるので古い値は返さない
+        self.world_cache = CachePolicy(config.world_cache_ttl)
+        self.roles_cache = CachePolicy(config.roles_cache_ttl, config.cache_stale)
+        self.flight = SingleFlight()
 
     def _request_with_relogin(self, method: str, url: str, **kwargs):
         try:
-            return self.http.request(method, url, **kwargs)
+            resp = self.http.request(method, url, **kwargs)
         except requests.HTTPError as e:
             if e.response is not None and e.response.status_code == 401:
                 logging.warning("認証エラー: 再ログインしてリトライ")
@@ -32,79 +51,123 @@ class VRChatAPI:
                     raise
                 return self.http.request(method, url, **kwargs)
             raise
+        self.auth.mark_verified()
+        return resp
+
+    def _get(
+        self,
+        url: str,
+        parse: Callable[[Any], T],
+        params: Optional[dict] = None,
+        cache: Optional[CachePolicy] = None,
+        raw: bool = False,
+    ) -> T:
+        key = cache_key(url, params)
+
+        # 同時に実行された同じGETは1回の通信・パース結果を共有する
+        def fetch() -> T:
+            resp = self._request_with_relogin("GET", url, params=params)
+            if raw:
+                # 応答のbytesから直接モデルを生成する (中間のdictを作らない)
+                debug_json(resp.content)
+                return parse(resp.content)
+
+            data = json.loads(resp.content)
+            debug_json(data)
+            value = parse(data)
+            if cache is not None:
+                self.cache.put(key, data, value)
+            return value
+
+        if cache is not None and (hit := self.cache.get(key, cache, parse)):
+            value, stale = hit
+            if stale:
+                self._revalidate(key, fetch)
+            return value
+
+        return self.flight.do(key, fetch)
+
+    def _revalidate(self, key: str, fetch: Callable[[], T]) -> None:
+        # 古いキャッシュを返した場合は裏で取得し直す
+        if not self.cache.begin_refresh(key):
+            return
+
+        def run() -> None:
+            try:
+                self.flight.do(key, fetch)
+            except Exception as e:
+                logging.warning(f"⚠️ Failed to revalidate {key}: {e}")
+            finally:
+                self.cache.end_refresh(key)
+
+        threading.Thread(target=run, name=f"revalidate {key}", daemon=True).start()
 
     def get_user_info(self, user_id: str) -> UserInfo:
-        resp = self._request_with_relogin(
-            "GET", f"{self.config.BASE_URL}/users/{user_id}"
+        return self._get(
+            f"{self.config.base_url}/users/{user_id}",
+            UserInfo.model_validate_json,
+            raw=True,
         )
-        data = resp.json()
-        logging.debug(json.dumps(data, indent=2, ensure_ascii=False))
-        return UserInfo(**data)
 
-    def get_group_instances(self, group_id: str) -> list[GroupInstance]:
-        resp = self._request_with_relogin(
-            "GET", f"{self.config.BASE_URL}/groups/{group_id}/instances"
+    def get_group_instances(self, group_id: str) -> list[GroupInstanceSnapshot]:
+        return self._get(
+            f"{self.config.base_url}/groups/{group_id}/instances",
+            lambda data: [GroupInstanceSnapshot.from_json(gi) for gi in data],
         )
-        data = resp.json()
-        logging.debug(json.dumps(data, indent=2, ensure_ascii=False))
-        return [GroupInstance(**gi) for gi in data]
 
     def get_group_roles(self, group_id: str) -> list[GroupRole]:
-        resp = self._request_with_relogin(
-            "GET", f"{self.config.BASE_URL}/groups/{group_id}/roles"
+        return self._get(
+            f"{self.config.base_url}/groups/{group_id}/roles",
+            lambda data: [GroupRole(**gr) for gr in data],
+            cache=self.roles_cache,
         )
-        data = resp.json()
-        logging.debug(json.dumps(data, indent=2, ensure_ascii=False))
-        return [GroupRole(**gr) for gr in data]
 
-    def get_instance_info(self, world_id: str, instance_id: str) -> InstanceInfo:
-        resp = self._request_with_relogin(
-            "GET", f"{self.config.BASE_URL}/instances/{world_id}:{instance_id}"
+    def get_instance_info(self, world_id: str, instance_id: str) -> InstanceSnapshot:
+        return self._get(
+            f"{self.config.base_url}/instances/{world_id}:{instance_id}",
+            InstanceSnapshot.from_json,
         )
-        data = resp.json()
-        logging.debug(json.dumps(data, indent=2, ensure_ascii=False))
-        return InstanceInfo(**data)
 
     def create_instance(self, instance: CreateInstanceConfig):
         data = instance.model_dump(by_alias=True)
         resp = self._request_with_relogin(
-            "POST", "https://api.vrchat.cloud/api/1/instances", data=data
+            "POST", f"{self.config.base_url}/instances", data=data
         )
         resp.raise_for_status()
         data = resp.json()
-        logging.debug(json.dumps(data, indent=2, ensure_ascii=False))
+        debug_json(data)
         return InstanceInfo(**data)
 
-    def close_instance(self, instance: InstanceInfo):
+    def close_instance(self, instance: InstanceSnapshot):
         resp = self._request_with_relogin(
             "DELETE",
-            f"https://api.vrchat.cloud/api/1/instances/{instance.world_id}:{instance.instance_id}",
+            f"{self.config.base_url}/instances/{instance.world_id}:{instance.instance_id}",
         )
         resp.raise_for_status()
         data = resp.json()
-        logging.debug(json.dumps(data, indent=2, ensure_ascii=False))
+        debug_json(data)
         return InstanceInfo(**data)
 
     def get_group_posts(self, group_id: str) -> dict:
         resp = self._request_with_relogin(
-            "GET", f"{self.config.BASE_URL}/groups/{group_id}/posts"
+            "GET", f"{self.config.base_url}/groups/{group_id}/posts"
         )
         return resp.json()
 
-    def invite_myself(self, instance_info: InstanceInfo) -> dict:
-        resp = self._request_with_relogin(
-            "POST",
-            f"{self.config.BASE_URL}/invite/myself/to/{instance_info.world_id}:{instance_info.instance_id}",
-        )
+    def invite_myself(self, instance_info: InstanceSnapshot) -> dict:
+        with priority(Priority.HIGH):
+            resp = self._request_with_relogin(
+                "POST",
+                f"{self.config.base_url}/invite/myself/to/{instance_info.world_id}:{instance_info.instance_id}",
+            )
         return resp.json()
 
     def get_worlds(self, world_id: str) -> WorldsInfo:
-        resp = self._request_with_relogin(
-            "GET", f"{self.config.BASE_URL}/worlds/{world_id}"
+        return self._get(
+            f"{self.config.base_url}/worlds/{world_id}",
+            WorldsInfo.model_validate,
+            cache=self.world_cache,
         )
-        data = resp.json()
-        logging.debug(json.dumps(data, indent=2, ensure_ascii=False))
-        return WorldsInfo(**data)
 
     def get_group_posts(
         self,
@@ -114,9 +177,8 @@ class VRChatAPI:
         public_only: bool = True,
     ) -> list[GroupPostInfo]:
         params = {"n": n_count, "offset": offset, "publicOnly": public_only}
-        resp = self._request_with_relogin(
-            "GET", f"{self.config.BASE_URL}/groups/{group_id}/posts", params=params
+        return self._get(
+            f"{self.config.base_url}/groups/{group_id}/posts",
+            lambda data: [GroupPostInfo(**gp) for gp in data["posts"]],
+            params=params,
         )
-        data = resp.json()
-        logging.debug(json.dumps(data, indent=2, ensure_ascii=False))
-        return [GroupPostInfo(**gp) for gp in data["posts"]]
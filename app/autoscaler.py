@@ -0,0 +1,207 @@
+import json
+import time
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional, Union
+
+from app.const.group import INSTANCE_NAME_LIST
+from app.instance_manager import InstanceManager
+from app.model.snapshot import InstanceIndex, InstanceSnapshot
+from app.util.fs import write_json_atomic
+
+if TYPE_CHECKING:
+    from app.service.vrc_service import VRCService
+
+
+@dataclass(frozen=True)
+class AutoscalePolicy:
+    # オープン中のインスタンスの空き枠の合計がこれを下回ったら作成
+    min_headroom: int = 10
+    grace: float = 900  # 無人の状態がこの秒数続いたらクローズ
+    min_instances: int = 1  # クローズせずに残しておく最小数
+    max_instances: int = len(INSTANCE_NAME_LIST)
+    action_interval: float = 300  # 作成・クローズの最小間隔[秒]
+    # 作成したインスタンスが一覧に出てこないまま経過したら管理対象から外す秒数
+    forget_after: float = 600
+
+
+@dataclass(frozen=True)
+class CreateInstance:
+    name: str
+    headroom: int
+
+
+@dataclass(frozen=True)
+class CloseInstance:
+    instance: InstanceSnapshot
+    empty_for: float
+
+
+AutoscaleAction = Union[CreateInstance, CloseInstance]
+
+
+def managed_name(inst: InstanceSnapshot) -> Optional[str]:
+    # 作成時に "<名前>_<日時>" の表示名にしているので、名前リストのどれかを返す
+    if not inst.display_name:
+        return None
+    for name in INSTANCE_NAME_LIST:
+        if inst.display_name == name or inst.display_name.startswith(f"{name}_"):
+            return name
+    return None
+
+
+def headroom(inst: InstanceSnapshot) -> int:
+    # 空き枠から待機列の人数を引いたもの (待機列が長いと負になる)
+    queue = inst.queue_size if inst.queue_enabled else 0
+    return max(inst.world.capacity - inst.user_count, 0) - queue
+
+
+class InstanceAutoscaler:
+    # グループインスタンスの空き枠を監視し、不足したら作成・無人が続いたらクローズする
+    def __init__(
+        self,
+        service: "VRCService",
+        instances: InstanceManager,
+        policy: AutoscalePolicy = AutoscalePolicy(),
+        role_ids: Optional[list[str]] = None,
+        dry_run: bool = False,
+        state_file: Optional[Path] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.service = service
+        self.instances = instances
+        self.policy = policy
+        self.role_ids = role_ids
+        self.dry_run = dry_run
+        self.state_file = state_file
+        self.clock = clock
+        self._empty_since: dict[str, float] = {}
+        self._last_action: Optional[float] = None
+        # 自分で作成したインスタンスID -> 作成時刻(UNIX時間)
+        # 管理者が手動で作成したインスタンスはクローズしないよう、再起動後も引き継ぐ
+        self._created: dict[str, float] = self._load()
+
+    def _load(self) -> dict[str, float]:
+        if self.state_file is None or not self.state_file.exists():
+            return {}
+
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            return {str(id): float(ts) for id, ts in saved["created"].items()}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logging.warning(
+                f"⚠️ Failed to load autoscaler state {self.state_file}: {e}"
+            )
+            return {}
+
+    def _save(self) -> None:
+        if self.state_file is None:
+            return
+
+        try:
+            write_json_atomic(self.state_file, {"created": self._created})
+        except OSError as e:
+            logging.warning(
+                f"⚠️ Failed to save autoscaler state {self.state_file}: {e}"
+            )
+
+    def _forget(self, index: InstanceIndex) -> None:
+        # クローズ済み・一覧から消えたインスタンスを管理対象から外す
+        # (作成直後は一覧に反映されていないことがあるので forget_after 秒は残す)
+        now = time.time()
+        listed = {i.id for i in index.by_population}
+        forgotten = [
+            id
+            for id, created_at in self._created.items()
+            if id not in listed and now - created_at >= self.policy.forget_after
+        ]
+        for id in forgotten:
+            del self._created[id]
+        if forgotten:
+            self._save()
+
+    def plan(self, index: InstanceIndex) -> list[AutoscaleAction]:
+        now = self.clock()
+        open_instances = index.by_population
+        total = sum(headroom(i) for i in open_instances)
+
+        # 無人になった時刻を記録 (人が入ったら解除)
+        empty = {i.id for i in open_instances if i.user_count == 0}
+        self._empty_since = {id: self._empty_since.get(id, now) for id in empty}
+
+        if (
+            self._last_action is not None
+            and now - self._last_action < self.policy.action_interval
+        ):
+            return []
+
+        if (
+            total < self.policy.min_headroom
+            and len(open_instances) < self.policy.max_instances
+        ):
+            used = {managed_name(i) for i in open_instances}
+            name = next((n for n in INSTANCE_NAME_LIST if n not in used), None)
+            if name is None:
+                logging.warning("⚠️ No unused instance name left for autoscaling")
+                return []
+            return [CreateInstance(name, total)]
+
+        # 空き枠が足りている場合のみ、自分で作成したインスタンスをクローズする
+        # (クローズしても空き枠の不足にならない範囲で1つずつ)
+        if len(open_instances) <= self.policy.min_instances:
+            return []
+        for inst in reversed(open_instances):
+            since = self._empty_since.get(inst.id)
+            if (
+                since is not None
+                and now - since >= self.policy.grace
+                and inst.id in self._created
+                and total - headroom(inst) >= self.policy.min_headroom
+            ):
+                return [CloseInstance(inst, now - since)]
+        return []
+
+    def step(self) -> list[AutoscaleAction]:
+        self.instances.update()
+        index = self.instances.instances
+        self._forget(index)
+        actions = self.plan(index)
+
+        open_instances = index.by_population
+        logging.info(
+            f"📊 {len(open_instances)} open instances, "
+            f"headroom {sum(headroom(i) for i in open_instances)}"
+        )
+        for action in actions:
+            self._execute(action)
+        return actions
+
+    def _execute(self, action: AutoscaleAction) -> None:
+        self._last_action = self.clock()
+        prefix = "🧪 [dry-run] " if self.dry_run else ""
+
+        match action:
+            case CreateInstance(name, total):
+                logging.info(f"{prefix}➕ Creating {name} (headroom {total})")
+                if not self.dry_run:
+                    inst = self.service.create_instance(
+                        group_id=self.instances.group_id,
+                        display_name=name,
+                        role_ids=self.role_ids,
+                        queue_enabled=True,
+                    )
+                    logging.info(f"✅ Created {inst.display_name or inst.name}")
+                    self._created[inst.id] = time.time()
+                    self._save()
+            case CloseInstance(inst, empty_for):
+                logging.info(
+                    f"{prefix}🛑 Closing {inst.display_name or inst.name} "
+                    f"(empty for {empty_for:.0f}s)"
+                )
+                if not self.dry_run:
+                    self.service.close_instance(inst)
+                    if self._created.pop(inst.id, None) is not None:
+                        self._save()
+                self._empty_since.pop(inst.id, None)
@@ -24,10 +24,78 @@ class Config:
         self.user_id: str = self._require_env("USER_ID")
         self.profile: int = int(self._require_env("PROFILE"))
         self.patlite_ip: Optional[str] = os.getenv("PATLITE_IP")
+        self.base_url: str = os.getenv("VRCHAT_API_URL", self.BASE_URL)
+        self.fetch_workers: int = int(os.getenv("FETCH_WORKERS", "4"))
+        self.instance_max_age: float = float(os.getenv("INSTANCE_MAX_AGE", "180"))
+        self.instance_hot_count: int = int(os.getenv("INSTANCE_HOT_COUNT", "3"))
+        self.public_scan_limit: int = int(os.getenv("PUBLIC_SCAN_LIMIT", "5"))
+        self.recommend_max_age: float = float(os.getenv("RECOMMEND_MAX_AGE", "180"))
+        self.tick_fast: float = float(os.getenv("TICK_FAST", "10"))
+        self.tick_normal: float = float(os.getenv("TICK_NORMAL", "15"))
+        self.tick_slow: float = float(os.getenv("TICK_SLOW", "300"))
+        self.launch_max_attempts: int = int(os.getenv("LAUNCH_MAX_ATTEMPTS", "3"))
+        self.user_interval: float = float(os.getenv("USER_INTERVAL", "10"))
+        self.instances_interval: float = float(os.getenv("INSTANCES_INTERVAL", "60"))
+        self.posts_interval: float = float(os.getenv("POSTS_INTERVAL", "300"))
+        self.tick_mode: str = os.getenv("TICK_MODE", "sequential")
+        self.tick_deadline: float = float(os.getenv("TICK_DEADLINE", "20"))
+        self.session_trust: float = float(os.getenv("SESSION_TRUST", "300"))
+        self.population_event_threshold: int = int(
+            os.getenv("POPULATION_EVENT_THRESHOLD", "3")
+        )
+        self.queue_event_threshold: int = int(os.getenv("QUEUE_EVENT_THRESHOLD", "3"))
+        self.table_log_interval: float = float(os.getenv("TABLE_LOG_INTERVAL", "600"))
+        self.history_retention_days: float = float(
+            os.getenv("HISTORY_RETENTION_DAYS", "30")
+        )
+        self.history_flush_interval: float = float(
+            os.getenv("HISTORY_FLUSH_INTERVAL", "60")
+        )
+        self.population_threshold: float = float(os.getenv("POPULATION_THRESHOLD", "8"))
+        self.score_population: float = float(os.getenv("SCORE_POPULATION", "1.0"))
+        self.score_headroom: float = float(os.getenv("SCORE_HEADROOM", "0"))
+        self.score_queue: float = float(os.getenv("SCORE_QUEUE", "-1.0"))
+        self.score_closing: float = float(os.getenv("SCORE_CLOSING", "-10"))
+        self.score_closing_window: float = float(
+            os.getenv("SCORE_CLOSING_WINDOW", "1800")
+        )
+        self.invite_cooldown: float = float(os.getenv("INVITE_COOLDOWN", "300"))
+        self.invite_switch_margin: int = int(os.getenv("INVITE_SWITCH_MARGIN", "3"))
+        self.invite_arrival_timeout: float = float(
+            os.getenv("INVITE_ARRIVAL_TIMEOUT", "600")
+        )
+        self.forecast_horizon: float = float(os.getenv("FORECAST_HORIZON", "300"))
+        self.forecast_window: float = float(os.getenv("FORECAST_WINDOW", "600"))
+        self.forecast_margin: float = float(os.getenv("FORECAST_MARGIN", "3"))
+        self.forecast_queue_weight: float = float(
+            os.getenv("FORECAST_QUEUE_WEIGHT", "0.5")
+        )
+        self.world_cache_ttl: float = float(os.getenv("WORLD_CACHE_TTL", "30"))
+        self.roles_cache_ttl: float = float(os.getenv("ROLES_CACHE_TTL", "3600"))
+        self.cache_stale: float = float(os.getenv("CACHE_STALE", "86400"))
+        self.cache_max_entries: int = int(os.getenv("CACHE_MAX_ENTRIES", "256"))
+
+        if self.tick_mode not in ("sequential", "parallel", "async"):
+            raise ConfigError(
+                f"TICK_MODE must be sequential, parallel or async, got {self.tick_mode}"
+            )
 
         self.cookie_file = Path("data") / f"{self.user_id}.json"
         self.cookie_file.parent.mkdir(parents=True, exist_ok=True)
 
+        # 空文字を指定した場合はディスクに保存しない
+        cache_file = os.getenv("RESPONSE_CACHE_FILE", "data/response_cache.json")
+        self.response_cache_file: Optional[Path] = (
+            Path(cache_file) if cache_file else None
+        )
+        self.history_db: Optional[Path] = self.history_db_path()
+
+    @staticmethod
+    def history_db_path() -> Optional[Path]:
+        # 認証情報なしで履歴だけ参照するツール(analytics等)からも使う
+        load_dotenv(override=True)
+        history_db = os.getenv("HISTORY_DB", "data/history.sqlite3")
+        return Path(history_db) if history_db else None
 
     @staticmethod
     def _require_env(key: str) -> str:
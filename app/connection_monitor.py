@@ -16,6 +16,10 @@ class ConnectionMonitor:
         self.max_attempts = max_attempts
         self._lost_count = 0
 
+    @property
+    def lost_count(self) -> int:
+        return self._lost_count
+
     def check(self, user_info: UserInfo) -> bool:
         if user_info.state != UserState.ONLINE:
             self._lost_count += 1
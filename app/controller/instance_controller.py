@@ -1,14 +1,19 @@
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from app.model.vrchat import GroupRole, InstanceInfo
+from app.model.snapshot import InstanceIndex, InstanceSnapshot
+from app.model.vrchat import GroupRole
 from app.service.vrc_service import VRCService
+from app.util.fetch import fetch_all
 from app.ui.dialog.create_instance_dialog import CreateInstanceInput
 
 
 @dataclass(frozen=True)
 class InstanceCache:
-    instances: list[InstanceInfo]
+    instances: InstanceIndex
     updated_at: datetime
+    failures: dict[str, Exception] = field(default_factory=dict)
+    elapsed: float = 0.0
 
 
 class InstanceController:
@@ -26,38 +31,45 @@ class InstanceController:
         if not refresh and group_id in self.instances_by_group:
             return self.instances_by_group[group_id]
 
-        instances: list[InstanceInfo] = []
+        started = time.monotonic()
 
         group_instances = self.service.get_group_instances(group_id)
-        for gi in group_instances:
-            try:
-                inst = self.service.get_instance_info(gi.world.id, gi.instance_id)
-                instances.append(inst)
-            except Exception as e:
-                print("取得失敗:", e)
+        results = fetch_all(
+            lambda gi: self.service.get_instance_info(gi.world.id, gi.instance_id),
+            group_instances,
+            max_workers=self.cfg.fetch_workers,
+        )
+
+        failures: dict[str, Exception] = {}
+        for r in results:
+            if not r.ok:
+                print("取得失敗:", r.error)
+                failures[r.key.instance_id] = r.error
 
         result = InstanceCache(
-            instances=instances,
+            instances=InstanceIndex(r.value for r in results if r.ok),
             updated_at=datetime.now(timezone.utc),
+            failures=failures,
+            elapsed=time.monotonic() - started,
         )
         self.instances_by_group[group_id] = result
         return result
 
     def launch(
         self,
-        inst: InstanceInfo,
+        inst: InstanceSnapshot,
         profile: int,
         extra_args: list[str],
     ):
         self.service.launch(inst, profile, extra_args)
 
-    def launch(self, inst: InstanceInfo, profile: int, extra_args: list[str]):
+    def launch(self, inst: InstanceSnapshot, profile: int, extra_args: list[str]):
         self.service.launch(inst, profile, extra_args)
 
-    def close_instance(self, inst: InstanceInfo):
+    def close_instance(self, inst: InstanceSnapshot):
         self.service.close_instance(inst)
 
-    def get_launch_url(self, instance: InstanceInfo) -> str:
+    def get_launch_url(self, instance: InstanceSnapshot) -> str:
         return self.service.get_launch_url(instance)
 
     def get_group_roles(self, group_id: str) -> list[GroupRole]:
@@ -74,13 +86,12 @@ class InstanceController:
     def save_session(self):
         self.service.save_session()
 
-    def get_instance_by_id(self, group_id: str, id: str) -> InstanceInfo:
+    def get_instance_by_id(self, group_id: str, id: str) -> InstanceSnapshot:
         cache = self.instances_by_group.get(group_id)
         if not cache:
             raise ValueError("インスタンスキャッシュが存在しません")
 
-        for inst in cache.instances:
-            if inst.id == id:
-                return inst
-
-        raise ValueError("指定されたインスタンスが見つかりません")
+        inst = cache.instances.by_id(id)
+        if inst is None:
+            raise ValueError("指定されたインスタンスが見つかりません")
+        return inst
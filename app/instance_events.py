@@ -0,0 +1,165 @@
+import logging
+from dataclasses import dataclass
+from datetime import timedelta, timezone
+from typing import Callable, Optional, Union
+
+from app.model.snapshot import InstanceIndex, InstanceSnapshot
+
+
+@dataclass(frozen=True)
+class SnapshotUpdated:
+    index: InstanceIndex  # 更新後のスナップショット全体 (初回も含め毎回通知)
+
+
+@dataclass(frozen=True)
+class InstanceOpened:
+    instance: InstanceSnapshot
+
+
+@dataclass(frozen=True)
+class InstanceClosed:
+    instance: InstanceSnapshot
+
+
+@dataclass(frozen=True)
+class InstanceRemoved:
+    instance: InstanceSnapshot  # 一覧から消える直前の情報
+
+
+@dataclass(frozen=True)
+class PopulationChanged:
+    instance: InstanceSnapshot
+    previous: int
+    delta: int
+
+
+@dataclass(frozen=True)
+class QueueChanged:
+    instance: InstanceSnapshot
+    previous: int
+    delta: int
+
+
+@dataclass(frozen=True)
+class UserMoved:
+    previous: Optional[str]  # 移動前のロケーション
+    location: Optional[str]
+    instance: Optional[InstanceSnapshot]  # 移動先がグループインスタンスの場合のみ
+
+
+InstanceEvent = Union[
+    SnapshotUpdated,
+    InstanceOpened,
+    InstanceClosed,
+    InstanceRemoved,
+    PopulationChanged,
+    QueueChanged,
+    UserMoved,
+]
+
+
+class InstanceEventStream:
+    # 前回のスナップショットとの差分をイベントとして購読者に通知する
+    def __init__(self, population_threshold: int = 1, queue_threshold: int = 1):
+        self.population_threshold = population_threshold
+        self.queue_threshold = queue_threshold
+        self._handlers: list[Callable[[InstanceEvent], None]] = []
+        self._previous: Optional[InstanceIndex] = None
+        self._location: Optional[str] = None
+        self._reported_users: dict[str, int] = {}
+        self._reported_queue: dict[str, int] = {}
+
+    def subscribe(self, handler: Callable[[InstanceEvent], None]) -> None:
+        self._handlers.append(handler)
+
+    def update(self, index: InstanceIndex) -> list[InstanceEvent]:
+        previous, self._previous = self._previous, index
+        events: list[InstanceEvent] = [SnapshotUpdated(index)]
+
+        # 初回は比較対象がないので基準として記録するだけ
+        if previous is None:
+            self._reported_users = {i.id: i.user_count for i in index}
+            self._reported_queue = {i.id: i.queue_size for i in index}
+            self._publish(events)
+            return events
+
+        for inst in index:
+            before = previous.by_id(inst.id)
+            if before is None:
+                events.append(InstanceOpened(inst))
+                self._reported_users[inst.id] = inst.user_count
+                self._reported_queue[inst.id] = inst.queue_size
+                continue
+
+            if before.closed_at is None and inst.closed_at is not None:
+                events.append(InstanceClosed(inst))
+
+            # 小さな増減は積み上げて閾値を超えた時点で通知する
+            reported = self._reported_users.get(inst.id, before.user_count)
+            if abs(inst.user_count - reported) >= self.population_threshold:
+                events.append(
+                    PopulationChanged(inst, reported, inst.user_count - reported)
+                )
+                self._reported_users[inst.id] = inst.user_count
+
+            reported = self._reported_queue.get(inst.id, before.queue_size)
+            if abs(inst.queue_size - reported) >= self.queue_threshold:
+                events.append(QueueChanged(inst, reported, inst.queue_size - reported))
+                self._reported_queue[inst.id] = inst.queue_size
+
+        for before in previous:
+            if index.by_id(before.id) is None:
+                events.append(InstanceRemoved(before))
+                self._reported_users.pop(before.id, None)
+                self._reported_queue.pop(before.id, None)
+
+        self._publish(events)
+        return events
+
+    def update_user(self, location: Optional[str]) -> Optional[UserMoved]:
+        previous, self._location = self._location, location
+        if previous == location:
+            return None
+
+        instance = self._previous.by_location(location) if self._previous else None
+        event = UserMoved(previous, location, instance)
+        self._publish([event])
+        return event
+
+    def _publish(self, events: list[InstanceEvent]) -> None:
+        for event in events:
+            for handler in self._handlers:
+                try:
+                    handler(event)
+                except Exception as e:
+                    logging.exception(e)
+
+
+def _label(inst: InstanceSnapshot) -> str:
+    return f"{inst.display_name or inst.name} ({inst.user_count}/{inst.world.capacity})"
+
+
+def log_event(event: InstanceEvent) -> None:
+    match event:
+        case InstanceOpened(inst):
+            logging.info(f"🆕 Instance opened: {_label(inst)}")
+        case InstanceClosed(inst):
+            closed_jst = inst.closed_at.astimezone(timezone(timedelta(hours=9)))
+            logging.info(
+                f"🚧 Instance closed: {_label(inst)} at {closed_jst.strftime('%Y-%m-%d %H:%M:%S')}"
+            )
+        case InstanceRemoved(inst):
+            logging.info(f"🗑️ Instance removed: {inst.display_name or inst.name}")
+        case PopulationChanged(inst, previous, delta):
+            logging.info(
+                f"👤 {inst.display_name or inst.name}: {previous} → {inst.user_count} ({delta:+d})"
+            )
+        case QueueChanged(inst, previous, delta):
+            logging.info(
+                f"👥 {inst.display_name or inst.name} queue: {previous} → {inst.queue_size} ({delta:+d})"
+            )
+        case UserMoved(_, location, inst):
+            if inst is not None:
+                logging.info(f"🚶 Moved to {_label(inst)}")
+            else:
+                logging.info(f"🚶 Moved to {location or 'offline'}")
@@ -1,60 +1,284 @@
+import time
+import asyncio
 import logging
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 
 from app.api.vrchat_api import VRChatAPI
-from app.model.vrchat import GroupAccessType, InstanceInfo, InstanceType, UserInfo
+from app.util.fetch import FetchResult, fetch_all
+from app.instance_events import InstanceEventStream
+from app.instance_scoring import InstanceScorer
+from app.model.snapshot import GroupInstanceSnapshot, InstanceIndex, InstanceSnapshot
+from app.model.vrchat import GroupAccessType, InstanceType, UserInfo
+
+if TYPE_CHECKING:
+    from app.api.async_vrchat_api import AsyncVRChatAPI
+
+
+@dataclass(frozen=True)
+class CachedInstance:
+    info: InstanceSnapshot
+    member_count: int
+    fetched_at: float  # time.monotonic()
+
+
+@dataclass(frozen=True)
+class Recommendation:
+    instance: Optional[InstanceSnapshot]
+    updated_at: float  # time.monotonic()
 
 
 class InstanceManager:
-    def __init__(self, vrc_api: VRChatAPI, world_id: str, group_id: str):
+    def __init__(
+        self,
+        vrc_api: VRChatAPI,
+        world_id: str,
+        group_id: str,
+        max_workers: int = 4,
+        max_age: float = 180,
+        hot_count: int = 3,
+        public_scan_limit: int = 5,
+        recommend_max_age: float = 180,
+        events: Optional[InstanceEventStream] = None,
+        scorer: Optional[InstanceScorer] = None,
+    ):
         self.vrc_api = vrc_api
         self.world_id = world_id
         self.group_id = group_id
-        self._instances: list[InstanceInfo] = []
+        self.max_workers = max_workers
+        self.max_age = max_age
+        self.hot_count = hot_count
+        self.public_scan_limit = public_scan_limit
+        self.recommend_max_age = recommend_max_age
+        self.events = events or InstanceEventStream()
+        self.scorer = scorer or InstanceScorer()
+        self._index = InstanceIndex()
+        self._cache: dict[str, CachedInstance] = {}
+        self._closed: set[str] = set()  # クローズ済みで一覧に残っているもの
+        self._failures: dict[str, Exception] = {}
+        self.last_update_duration: Optional[float] = None
+        self.last_fetch_count: int = 0
+        self.last_find_detail_calls: int = 0
+        self._best_joinable: Optional[Recommendation] = None
+        self._best_populated: Optional[Recommendation] = None
 
     @property
-    def instances(self) -> list[InstanceInfo]:
-        return self._instances
+    def instances(self) -> InstanceIndex:
+        return self._index
+
+    @property
+    def failures(self) -> dict[str, Exception]:
+        return self._failures
 
     def update(self) -> None:
-        group_instances = self.vrc_api.get_group_instances(self.group_id)
-        self._instances = [
-            self.vrc_api.get_instance_info(self.world_id, gi.instance_id)
+        started = time.monotonic()
+
+        group_instances = self._listed(self.vrc_api.get_group_instances(self.group_id))
+
+        # 新規・人数変化あり・情報が古いものだけ詳細を再取得 (同時実行数はmax_workersで制限)
+        stale = self._stale(group_instances, started)
+        results = fetch_all(
+            lambda gi: self.vrc_api.get_instance_info(self.world_id, gi.instance_id),
+            stale,
+            max_workers=self.max_workers,
+        )
+
+        self._apply(group_instances, results, started)
+
+    async def update_async(self, api: "AsyncVRChatAPI") -> None:
+        started = time.monotonic()
+
+        group_instances = self._listed(await api.get_group_instances(self.group_id))
+        stale = self._stale(group_instances, started)
+
+        semaphore = asyncio.Semaphore(max(1, self.max_workers))
+
+        async def fetch(gi: GroupInstanceSnapshot) -> FetchResult:
+            async with semaphore:
+                try:
+                    info = await api.get_instance_info(self.world_id, gi.instance_id)
+                    return FetchResult(gi, value=info)
+                except Exception as e:
+                    return FetchResult(gi, error=e)
+
+        results = await asyncio.gather(*(fetch(gi) for gi in stale))
+        self._apply(group_instances, results, started)
+
+    def _listed(
+        self, group_instances: list[GroupInstanceSnapshot]
+    ) -> list[GroupInstanceSnapshot]:
+        group_instances = [gi for gi in group_instances if gi.world.id == self.world_id]
+
+        # 一覧から消えたインスタンスはキャッシュから削除
+        listed = {gi.instance_id for gi in group_instances}
+        for instance_id in self._cache.keys() - listed:
+            logging.debug(f"Instance {instance_id} is no longer listed")
+            del self._cache[instance_id]
+        self._closed &= listed
+
+        return group_instances
+
+    def _apply(
+        self,
+        group_instances: list[GroupInstanceSnapshot],
+        results: list[FetchResult],
+        started: float,
+    ) -> None:
+        self._failures = {}
+        for r in results:
+            if r.ok:
+                self._cache[r.key.instance_id] = CachedInstance(
+                    info=r.value,
+                    member_count=r.key.member_count,
+                    fetched_at=time.monotonic(),
+                )
+            else:
+                # 取得に失敗した場合は前回の情報があればそれを使う
+                self._failures[r.key.instance_id] = r.error
+                logging.warning(
+                    f"⚠️ Failed to fetch instance {r.key.instance_id}: {r.error}"
+                )
+
+        # クローズ済みのインスタンスは一覧に残っていても使わない (再取得もしない)
+        closed_before = datetime.now(timezone.utc)
+        for instance_id, cached in list(self._cache.items()):
+            closed_at = cached.info.closed_at
+            if closed_at is not None and closed_at <= closed_before:
+                logging.debug(f"Instance {instance_id} is closed")
+                del self._cache[instance_id]
+                self._closed.add(instance_id)
+
+        self._index = InstanceIndex(
+            self._cache[gi.instance_id].info
             for gi in group_instances
-            if gi.world.id == self.world_id
+            if gi.instance_id in self._cache
+        )
+        self.events.update(self._index)
+
+        # スナップショット更新ごとに推奨インスタンスも更新しておく
+        now = time.monotonic()
+        self._best_joinable = Recommendation(self.find(include_public=False), now)
+        self._best_populated = Recommendation(
+            self.find(include_public=False, most_populate=True), now
+        )
+
+        self.last_fetch_count = len(results)
+        self.last_update_duration = time.monotonic() - started
+        logging.debug(
+            f"Instance update took {self.last_update_duration:.2f}s "
+            f"({len(results)}/{len(group_instances)} fetched, {len(self._failures)} failed)"
+        )
+
+    def _stale(
+        self, group_instances: list[GroupInstanceSnapshot], now: float
+    ) -> list[GroupInstanceSnapshot]:
+        # 判断に使う人数上位のインスタンスは毎回最新の詳細 (待機列・クローズ) を取得する
+        open_instances = [
+            gi for gi in group_instances if gi.instance_id not in self._closed
+        ]
+        hot = {
+            gi.instance_id
+            for gi in sorted(open_instances, key=lambda gi: -gi.member_count)[
+                : self.hot_count
+            ]
+        }
+        return [
+            gi
+            for gi in open_instances
+            if gi.instance_id in hot or self._needs_refresh(gi, now)
         ]
 
+    def _needs_refresh(self, gi: GroupInstanceSnapshot, now: float) -> bool:
+        cached = self._cache.get(gi.instance_id)
+        if cached is None:
+            return True
+        if cached.member_count != gi.member_count:
+            return True
+        return now - cached.fetched_at >= self.max_age
+
+    def recommend(
+        self, most_populate: bool = False, max_age: Optional[float] = None
+    ) -> Optional[InstanceSnapshot]:
+        # 直近のスナップショットから求めた推奨先を返す (古い・該当なしの場合のみ探索)
+        rec = self._best_populated if most_populate else self._best_joinable
+        max_age = self.recommend_max_age if max_age is None else max_age
+
+        if rec is not None and rec.instance is not None:
+            age = time.monotonic() - rec.updated_at
+            if age <= max_age:
+                logging.debug(f"Using cached recommendation (age={age:.0f}s)")
+                return rec.instance
+            logging.info(f"ℹ️ Cached recommendation is stale (age={age:.0f}s)")
+
+        return self.find(most_populate=most_populate)
+
     def find(
         self,
         include_public: bool = True,
         most_populate: bool = False,
         capacity_margin: int = 1,
         close_margin: Optional[timedelta] = None,
-    ) -> Optional[InstanceInfo]:
+    ) -> Optional[InstanceSnapshot]:
         now = datetime.now()
 
-        def is_effectively_open(inst: InstanceInfo) -> bool:
+        def is_effectively_open(inst: InstanceSnapshot) -> bool:
             if inst.closed_at is None:
                 return True
             if close_margin and inst.closed_at > now + close_margin:
                 return True
             return False
 
-        # グループ内から探索
-        candidates = [
-            i
-            for i in self._instances
-            if i.group_access_type == GroupAccessType.PUBLIC
-            and is_effectively_open(i)
-            and (most_populate or (i.user_count < i.world.capacity - capacity_margin))
-        ]
+        self.last_find_detail_calls = 0
+        index = self._index
+
+        # グループ内の条件を満たすものからスコアが最も高いものを選ぶ
+        if close_margin is None and capacity_margin == index.capacity_margin:
+            # 更新時に求めた人数順・参加可否をそのまま使う
+            group = (
+                i
+                for i in index.by_population
+                if i.group_access_type == GroupAccessType.PUBLIC
+                and (most_populate or index.is_joinable(i))
+            )
+        else:
+            group = (
+                i
+                for i in sorted(index, key=lambda x: -x.user_count)
+                if i.group_access_type == GroupAccessType.PUBLIC
+                and is_effectively_open(i)
+                and (
+                    most_populate or (i.user_count < i.world.capacity - capacity_margin)
+                )
+            )
+        candidates = [best] if (best := self.scorer.best(list(group))) else []
 
         # グループで該当がない場合パブリックからも探索
         if include_public and len(candidates) == 0:
             worlds = self.vrc_api.get_worlds(self.world_id)
-            for entry in worlds.instances:
-                info = self.vrc_api.get_instance_info(self.world_id, entry.instance_id)
+
+            # 一覧の人数で事前に絞り込み、スコアの高い順に上位のみ詳細を確認する
+            entries = [
+                e
+                for e in worlds.instances
+                if self._is_public_instance_id(e.instance_id)
+                and (most_populate or e.user_count < worlds.capacity - capacity_margin)
+            ]
+            scores = self.scorer.score_entries(entries, worlds.capacity)
+            entries = [e for _, e in sorted(zip(scores, entries), key=lambda x: -x[0])]
+
+            for entry in entries[: self.public_scan_limit]:
+                self.last_find_detail_calls += 1
+                try:
+                    info = self.vrc_api.get_instance_info(
+                        self.world_id, entry.instance_id
+                    )
+                except Exception as e:
+                    # 一覧の取得後に閉じられたインスタンスは飛ばす
+                    logging.warning(
+                        f"⚠️ Failed to fetch instance {entry.instance_id}: {e}"
+                    )
+                    continue
                 if (
                     info.type == InstanceType.PUBLIC
                     and is_effectively_open(info)
@@ -63,18 +287,30 @@ class InstanceManager:
                         or (info.user_count < info.world.capacity - capacity_margin)
                     )
                 ):
+                    # スコアの高い順に見ているので最初に条件を満たしたものを採用
                     candidates.append(info)
+                    break
+
+            logging.debug(
+                f"Public scan: {self.last_find_detail_calls} detail calls "
+                f"({len(entries)}/{len(worlds.instances)} entries ranked)"
+            )
 
-        return max(candidates, key=lambda x: x.user_count, default=None)
+        return self.scorer.best(candidates)
+
+    @staticmethod
+    def _is_public_instance_id(instance_id: str) -> bool:
+        # "12345~region(jp)" のようにアクセス種別の指定がないものがパブリック
+        return not any(
+            f"~{t}(" in instance_id for t in ("hidden", "friends", "private", "group")
+        )
 
     def print(self, current_location: str) -> None:
-        if not self._instances:
+        if not self._index:
             logging.info("ℹ️ No instance data available (call update() first).")
             return
 
-        for inst in sorted(
-            self._instances, key=lambda x: (x.closed_at is not None, -x.user_count)
-        ):
+        for inst in self._index.display_order:
             msg = f"📌 Instance Name: {inst.name}, 👤Users: {inst.user_count}/{inst.world.capacity}"
             msg += f", 👥Queue: {inst.queue_size if inst.queue_enabled else 'disabled'}"
 
@@ -0,0 +1,122 @@
+import math
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Optional, Sequence
+
+import numpy as np
+
+from app.model.snapshot import InstanceSnapshot
+from app.model.vrchat import InstanceEntry
+
+if TYPE_CHECKING:
+    from app.config import Config
+
+# これ以上の件数はnumpyでまとめて計算する (少数ならPythonの方が速い)
+VECTORIZE_MIN: int = 64
+
+
+@dataclass(frozen=True)
+class ScoreWeights:
+    population: float = 1.0  # 1人あたり
+    headroom: float = 0.0  # 空き枠1人分あたり
+    queue: float = -1.0  # 待機列1人あたり (並んでいる分だけ入りにくい)
+    closing: float = -10.0  # クローズ済み・クローズ直前の場合
+    closing_window: float = 1800  # クローズの何秒前から減点し始めるか
+
+    @classmethod
+    def from_config(cls, config: "Config") -> "ScoreWeights":
+        return cls(
+            population=config.score_population,
+            headroom=config.score_headroom,
+            queue=config.score_queue,
+            closing=config.score_closing,
+            closing_window=config.score_closing_window,
+        )
+
+
+class InstanceScorer:
+    # 人数・空き枠・待機列・クローズまでの時間からインスタンスの優先度を求める
+    # (人数のみの重みで従来の人数順と同じになる。別の基準にする場合はscoreを差し替える)
+    def __init__(
+        self,
+        weights: ScoreWeights = ScoreWeights(),
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.weights = weights
+        self.clock = clock
+
+    def score(
+        self,
+        users: Sequence[int],
+        capacity: Sequence[int],
+        queue: Sequence[int],
+        closes_in: Sequence[float],  # クローズまでの秒数 (予定がなければinf)
+    ) -> list[float]:
+        w = self.weights
+        if len(users) >= VECTORIZE_MIN:
+            u = np.asarray(users, dtype=np.float64)
+            c = np.asarray(capacity, dtype=np.float64)
+            q = np.asarray(queue, dtype=np.float64)
+            t = np.asarray(closes_in, dtype=np.float64)
+            if w.closing_window > 0:
+                closing = np.clip(1 - t / w.closing_window, 0, 1)
+            else:
+                closing = (t <= 0).astype(np.float64)
+            return (
+                w.population * u
+                + w.headroom * np.maximum(c - u, 0)
+                + w.queue * q
+                + w.closing * closing
+            ).tolist()
+
+        scores = []
+        for u, c, q, t in zip(users, capacity, queue, closes_in):
+            if w.closing_window > 0:
+                closing = min(max(1 - t / w.closing_window, 0.0), 1.0)
+            else:
+                closing = float(t <= 0)
+            scores.append(
+                w.population * u
+                + w.headroom * max(c - u, 0)
+                + w.queue * q
+                + w.closing * closing
+            )
+        return scores
+
+    def score_instances(self, instances: Sequence[InstanceSnapshot]) -> list[float]:
+        now = self.clock()
+        return self.score(
+            [i.user_count for i in instances],
+            [i.world.capacity for i in instances],
+            [i.queue_size if i.queue_enabled else 0 for i in instances],
+            [
+                i.closed_at.timestamp() - now if i.closed_at else math.inf
+                for i in instances
+            ],
+        )
+
+    def score_resident(self, inst: InstanceSnapshot) -> float:
+        # 滞在中のインスタンスは待機列・空き枠・クローズに関係なく居られるので人数のみで評価する
+        return self.weights.population * inst.user_count
+
+    def score_entries(
+        self, entries: Sequence[InstanceEntry], capacity: int
+    ) -> list[float]:
+        # ワールドのインスタンス一覧は人数しか分からないので他の項目は既定値で計算する
+        return self.score(
+            [e.user_count for e in entries],
+            [capacity] * len(entries),
+            [0] * len(entries),
+            [math.inf] * len(entries),
+        )
+
+    def rank(
+        self, instances: Sequence[InstanceSnapshot]
+    ) -> list[tuple[InstanceSnapshot, float]]:
+        # スコアの高い順 (同点の場合は元の順)
+        scored = zip(instances, self.score_instances(instances))
+        return sorted(scored, key=lambda x: -x[1])
+
+    def best(self, instances: Sequence[InstanceSnapshot]) -> Optional[InstanceSnapshot]:
+        ranked = self.rank(instances)
+        return ranked[0][0] if ranked else None
@@ -0,0 +1,110 @@
+import time
+import logging
+import statistics
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from app.api.vrchat_api import VRChatAPI
+from app.model.snapshot import InstanceIndex, InstanceSnapshot
+from app.util.metrics import Counters
+
+
+@dataclass(frozen=True)
+class PendingInvite:
+    location: str
+    name: str
+    sent_at: float  # time.monotonic()
+
+
+class InviteController:
+    # 自分宛てのInviteの送信を間引く
+    # - 同じ移動先へは cooldown 秒以内に再送しない
+    # - 送信済み・到着直後の移動先より switch_margin 人以上多い場合のみ移動先を切り替える
+    def __init__(
+        self,
+        vrc_api: VRChatAPI,
+        cooldown: float = 300,
+        switch_margin: int = 3,
+        arrival_timeout: float = 600,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.vrc_api = vrc_api
+        self.cooldown = cooldown
+        self.switch_margin = switch_margin
+        self.arrival_timeout = arrival_timeout
+        self.clock = clock
+        self.stats = Counters()
+        self.latencies: deque[float] = deque(maxlen=100)  # Inviteから到着までの秒数
+        self._pending: dict[str, PendingInvite] = {}
+        self._arrived: Optional[tuple[str, float]] = None  # (ロケーション, 到着時刻)
+
+    @property
+    def pending(self) -> list[PendingInvite]:
+        return list(self._pending.values())
+
+    def invite(self, target: InstanceSnapshot, index: InstanceIndex) -> bool:
+        now = self.clock()
+        self._expire(now)
+
+        if reason := self._suppress_reason(target, index, now):
+            self.stats.inc(f"suppressed_{reason}")
+            logging.debug(f"Invite to {target.name} suppressed ({reason})")
+            return False
+
+        self.vrc_api.invite_myself(target)
+        self._pending[target.location] = PendingInvite(
+            target.location, target.name, now
+        )
+        self.stats.inc("sent")
+        logging.info(f"✉️ Invited myself to {target.name}")
+        return True
+
+    def _suppress_reason(
+        self, target: InstanceSnapshot, index: InstanceIndex, now: float
+    ) -> Optional[str]:
+        sent = self._pending.get(target.location)
+        if sent is not None and now - sent.sent_at < self.cooldown:
+            return "cooldown"
+
+        # 直近の移動先と大差がなければ切り替えない (最大インスタンスが入れ替わり続ける場合の往復防止)
+        anchors = [p.location for p in self._pending.values() if p is not sent]
+        if self._arrived is not None and now - self._arrived[1] < self.cooldown:
+            anchors.append(self._arrived[0])
+        for location in anchors:
+            if location == target.location:
+                continue
+            anchor = index.by_location(location)
+            if (
+                anchor is not None
+                and index.is_open(anchor)
+                and target.user_count - anchor.user_count < self.switch_margin
+            ):
+                return "hysteresis"
+        return None
+
+    def _expire(self, now: float) -> None:
+        for location, p in list(self._pending.items()):
+            if now - p.sent_at >= self.arrival_timeout:
+                del self._pending[location]
+                self.stats.inc("expired")
+                logging.warning(
+                    f"⚠️ Invite to {p.name} not followed within {self.arrival_timeout:.0f}s"
+                )
+
+    def observe(self, location: Optional[str]) -> None:
+        # 取得したユーザーの現在地で移動先への到着を確認する
+        p = self._pending.get(location) if location else None
+        if p is None:
+            return
+
+        now = self.clock()
+        latency = now - p.sent_at
+        self.latencies.append(latency)
+        self.stats.inc("arrived")
+        self._pending.clear()
+        self._arrived = (location, now)
+        logging.info(
+            f"⏱️ Arrived at {p.name} {latency:.0f}s after invite "
+            f"(median {statistics.median(self.latencies):.0f}s)"
+        )
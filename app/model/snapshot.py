@@ -0,0 +1,296 @@
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Optional
+
+from app.model.group_access_type import GroupAccessType
+from app.model.instance_type import InstanceType
+from app.model.vrchat import InstanceInfo, WorldInfo
+
+
+def _parse_datetime(v: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(v) if v else None
+
+
+class WorldRef:
+    # ワールド情報はワールドIDごとに1つだけ保持して各インスタンスから参照する
+    __slots__ = ("id", "name", "capacity", "version", "_data", "_info")
+
+    def __init__(self, data: dict) -> None:
+        self.id: str = sys.intern(data["id"])
+        self.name: str = data["name"]
+        self.capacity: int = data["capacity"]
+        self.version: Optional[int] = data.get("version")
+        self._data = data
+        self._info: Optional[WorldInfo] = None
+
+    @property
+    def info(self) -> WorldInfo:
+        # 詳細が必要な場合のみモデルを生成する
+        if self._info is None:
+            self._info = WorldInfo.model_validate(self._data)
+        return self._info
+
+    @property
+    def data(self) -> dict:
+        return self._data
+
+    def __repr__(self) -> str:
+        return f"WorldRef(id={self.id!r}, name={self.name!r}, capacity={self.capacity})"
+
+
+_worlds: dict[str, WorldRef] = {}
+_worlds_lock = threading.Lock()
+
+
+def intern_world(data: dict) -> WorldRef:
+    with _worlds_lock:
+        world = _worlds.get(data["id"])
+        if world is None or world.version != data.get("version"):
+            world = _worlds[data["id"]] = WorldRef(data)
+        return world
+
+
+class InstanceSnapshot:
+    # 監視に必要な項目だけを保持するインスタンス情報 (InstanceInfoの軽量版)
+    __slots__ = (
+        "id",
+        "display_name",
+        "name",
+        "location",
+        "type",
+        "group_access_type",
+        "instance_id",
+        "short_name",
+        "user_count",
+        "queue_enabled",
+        "queue_size",
+        "region",
+        "tags",
+        "closed_at",
+        "world",
+        "world_id",
+        "owner_id",
+    )
+
+    def __init__(
+        self,
+        *,
+        id: str,
+        display_name: Optional[str],
+        name: str,
+        location: str,
+        type: InstanceType,
+        group_access_type: Optional[GroupAccessType],
+        instance_id: str,
+        short_name: str,
+        user_count: int,
+        queue_enabled: bool,
+        queue_size: int,
+        region: str,
+        tags: tuple[str, ...],
+        closed_at: Optional[datetime],
+        world: WorldRef,
+        owner_id: Optional[str],
+    ) -> None:
+        self.id = id
+        self.display_name = display_name
+        self.name = name
+        self.location = location
+        self.type = type
+        self.group_access_type = group_access_type
+        self.instance_id = instance_id
+        self.short_name = short_name
+        self.user_count = user_count
+        self.queue_enabled = queue_enabled
+        self.queue_size = queue_size
+        self.region = sys.intern(region)
+        self.tags = tuple(sys.intern(t) for t in tags)
+        self.closed_at = closed_at
+        self.world = world
+        self.world_id = world.id
+        self.owner_id = sys.intern(owner_id) if owner_id else None
+
+    @classmethod
+    def from_json(cls, data: dict) -> "InstanceSnapshot":
+        access = data.get("groupAccessType")
+        return cls(
+            id=data["id"],
+            display_name=data.get("displayName"),
+            name=data["name"],
+            location=data["location"],
+            type=InstanceType(data["type"]),
+            group_access_type=GroupAccessType(access) if access else None,
+            instance_id=data["instanceId"],
+            short_name=data["secureName"],
+            user_count=data["userCount"],
+            queue_enabled=data["queueEnabled"],
+            queue_size=data["queueSize"],
+            region=data["region"],
+            tags=data["tags"],
+            closed_at=_parse_datetime(data.get("closedAt")),
+            world=intern_world(data["world"]),
+            owner_id=data.get("ownerId"),
+        )
+
+    @classmethod
+    def from_info(cls, info: InstanceInfo) -> "InstanceSnapshot":
+        return cls(
+            id=info.id,
+            display_name=info.display_name,
+            name=info.name,
+            location=info.location,
+            type=info.type,
+            group_access_type=info.group_access_type,
+            instance_id=info.instance_id,
+            short_name=info.short_name,
+            user_count=info.user_count,
+            queue_enabled=info.queue_enabled,
+            queue_size=info.queue_size,
+            region=info.region,
+            tags=tuple(info.tags),
+            closed_at=info.closed_at,
+            world=intern_world(info.world.model_dump(by_alias=True, mode="json")),
+            owner_id=info.owner_id,
+        )
+
+    def to_info(self) -> InstanceInfo:
+        # 完全なモデルが必要な場合のみ生成する
+        return InstanceInfo.model_validate(
+            {
+                "id": self.id,
+                "displayName": self.display_name,
+                "name": self.name,
+                "location": self.location,
+                "type": self.type,
+                "groupAccessType": self.group_access_type,
+                "instanceId": self.instance_id,
+                "secureName": self.short_name,
+                "userCount": self.user_count,
+                "queueEnabled": self.queue_enabled,
+                "queueSize": self.queue_size,
+                "region": self.region,
+                "tags": list(self.tags),
+                "closedAt": self.closed_at,
+                "world": self.world.data,
+                "worldId": self.world_id,
+                "ownerId": self.owner_id,
+            }
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"InstanceSnapshot(name={self.name!r}, user_count={self.user_count}, "
+            f"location={self.location!r})"
+        )
+
+
+class GroupInstanceSnapshot:
+    # グループインスタンス一覧の1件 (GroupInstanceの軽量版)
+    __slots__ = ("instance_id", "location", "member_count", "world")
+
+    def __init__(
+        self, instance_id: str, location: str, member_count: int, world: WorldRef
+    ) -> None:
+        self.instance_id = instance_id
+        self.location = location
+        self.member_count = member_count
+        self.world = world
+
+    @classmethod
+    def from_json(cls, data: dict) -> "GroupInstanceSnapshot":
+        return cls(
+            instance_id=data["instanceId"],
+            location=data["location"],
+            member_count=data["memberCount"],
+            world=intern_world(data["world"]),
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"GroupInstanceSnapshot(instance_id={self.instance_id!r}, "
+            f"member_count={self.member_count})"
+        )
+
+
+class InstanceIndex:
+    # 更新ごとに1回だけ構築し、監視・探索・表示で共有するインスタンス一覧
+    __slots__ = (
+        "capacity_margin",
+        "_instances",
+        "_by_location",
+        "_by_id",
+        "_by_population",
+        "_closed",
+        "_open",
+        "_joinable",
+    )
+
+    def __init__(
+        self,
+        instances: Iterable[InstanceSnapshot] = (),
+        capacity_margin: int = 1,
+        now: Optional[datetime] = None,
+    ) -> None:
+        self.capacity_margin = capacity_margin
+        now = datetime.now(timezone.utc) if now is None else now
+        self._instances = tuple(instances)
+        self._by_location = {i.location: i for i in self._instances}
+        self._by_id = {i.id: i for i in self._instances}
+
+        # 人数の多い順 (同数の場合は一覧の順)
+        def order(i: InstanceSnapshot) -> int:
+            return -i.user_count
+
+        # クローズ予定時刻がまだ来ていないものはオープン中として扱う
+        # (クローズまでの時間はスコアで減点する)
+        def is_open(i: InstanceSnapshot) -> bool:
+            return i.closed_at is None or i.closed_at > now
+
+        self._by_population = tuple(
+            sorted((i for i in self._instances if is_open(i)), key=order)
+        )
+        self._closed = tuple(
+            sorted((i for i in self._instances if not is_open(i)), key=order)
+        )
+        self._open = frozenset(i.id for i in self._by_population)
+        self._joinable = frozenset(
+            i.id
+            for i in self._by_population
+            if i.user_count < i.world.capacity - capacity_margin
+        )
+
+    def __iter__(self) -> Iterator[InstanceSnapshot]:
+        return iter(self._instances)
+
+    def __len__(self) -> int:
+        return len(self._instances)
+
+    def __bool__(self) -> bool:
+        return bool(self._instances)
+
+    def by_location(self, location: Optional[str]) -> Optional[InstanceSnapshot]:
+        return self._by_location.get(location) if location else None
+
+    def by_id(self, id: str) -> Optional[InstanceSnapshot]:
+        return self._by_id.get(id)
+
+    @property
+    def by_population(self) -> tuple[InstanceSnapshot, ...]:
+        # クローズされていないインスタンスを人数の多い順に並べたもの
+        return self._by_population
+
+    @property
+    def display_order(self) -> tuple[InstanceSnapshot, ...]:
+        # 表示用: オープン中を人数順に並べ、クローズ済みはその後ろ
+        return self._by_population + self._closed
+
+    @property
+    def most_populated(self) -> Optional[InstanceSnapshot]:
+        return self._by_population[0] if self._by_population else None
+
+    def is_open(self, inst: InstanceSnapshot) -> bool:
+        return inst.id in self._open
+
+    def is_joinable(self, inst: InstanceSnapshot) -> bool:
+        return inst.id in self._joinable
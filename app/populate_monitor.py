@@ -2,7 +2,10 @@ import logging
 from typing import Optional
 from datetime import datetime, timedelta
 
-from app.model.vrchat import InstanceInfo, UserInfo
+from app.instance_events import InstanceEvent, UserMoved
+from app.instance_scoring import InstanceScorer
+from app.model.snapshot import InstanceIndex
+from app.model.vrchat import UserInfo
 from app.api.patlite_api import (
     ControlOptions,
     LedOptions,
@@ -14,52 +17,71 @@ from app.api.patlite_api import (
 
 class PopulationMonitor:
     def __init__(
-        self, pl_api: PatliteAPI, threshold: int = 8, notify_interval: int = 10
+        self,
+        pl_api: PatliteAPI,
+        threshold: float = 8,
+        notify_interval: int = 10,
+        scorer: Optional[InstanceScorer] = None,
     ):
         self.pl_api = pl_api
-        self.threshold = threshold
+        self.threshold = threshold  # スコアの差 (人数のみの重みでは人数差)
+        self.scorer = scorer or InstanceScorer()
         self.notify_interval = timedelta(minutes=notify_interval)
         self._was_in_most_populated: Optional[bool] = True
         self._last_notify_time: Optional[datetime] = None
 
-    def evaluate(self, instances: list[InstanceInfo], user: UserInfo) -> bool:
+    def evaluate(self, instances: InstanceIndex, user: UserInfo) -> bool:
         # 現在のインスタンスが最も人数が多いインスタンスかどうか判定
         if not instances:
             logging.warning("⚠️ No populated instances found to compare")
             return True
 
-        joinable_instances = [i for i in instances if i.closed_at is None]
-        if not joinable_instances:
+        most_populated = instances.most_populated
+        if most_populated is None:
             logging.warning("⚠️ All instances are closed.")
             return True
 
-        max_user_count = max(i.user_count for i in joinable_instances)
-        current_instance = next(
-            (i for i in instances if i.location == user.location),
-            None,
-        )
+        max_user_count = most_populated.user_count
+        current_instance = instances.by_location(user.location)
 
         # グルパブ外にいる場合
         if current_instance is None:
             logging.error("❌ User is not in any group instance")
             return self._handle_not_in_most_populated()
 
-        diff = max_user_count - current_instance.user_count
+        # 移動先の候補は待機列・クローズまでの時間も含めたスコア、
+        # 滞在中のインスタンスは居続けられるので人数のみのスコアで比較する
+        candidates = [i for i in instances.by_population if i is not current_instance]
+        diff = 0.0
+        if candidates:
+            diff = max(self.scorer.score_instances(candidates)) - (
+                self.scorer.score_resident(current_instance)
+            )
+        users_behind = max_user_count - current_instance.user_count
 
         if diff <= 0:
             logging.info("✅ This instance is most populated one")
             return self._handle_in_most_populated()
 
         elif diff < self.threshold:
-            logging.warning(f"⚠️ Nearly most populated (diff={diff})")
+            logging.warning(
+                f"⚠️ Nearly most populated (diff={users_behind}, score={diff:.1f})"
+            )
             return self._handle_in_most_populated()
 
         else:
             logging.error(
-                f"❌ This instance is {diff} users behind the most populated one"
+                f"❌ This instance is {users_behind} users behind the most populated one "
+                f"(score={diff:.1f})"
             )
             return self._handle_not_in_most_populated()
 
+    def on_event(self, event: InstanceEvent) -> None:
+        # 移動した場合は移動先で改めて判定・通知する
+        if isinstance(event, UserMoved):
+            self._was_in_most_populated = True
+            self._last_notify_time = None
+
     def _handle_in_most_populated(self) -> bool:
         self._was_in_most_populated = True
         self._last_notify_time = None
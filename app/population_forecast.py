@@ -0,0 +1,153 @@
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Iterable, NamedTuple, Optional
+
+from app.instance_events import InstanceEvent, SnapshotUpdated
+from app.model.snapshot import InstanceIndex, InstanceSnapshot
+
+
+class Observation(NamedTuple):
+    instance_id: str
+    users: int
+    queue: int
+    closes_at: Optional[float]  # クローズ(予定)時刻のUNIX時間 (なければNone)
+    capacity: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class Forecast:
+    instance_id: str
+    users: int
+    predicted: float  # horizon秒後の予測人数
+    trend: float  # 人/分
+    queue: int
+    closing: bool  # horizon秒以内にクローズされる (新規に入れない)
+
+
+class PopulationForecaster:
+    # 直近の人数の増減・待機列・クローズ予定から数分後に最大となるインスタンスを予測する
+    def __init__(
+        self,
+        horizon: float = 300,
+        window: float = 600,
+        queue_weight: float = 0.5,
+        margin: float = 3,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.horizon = horizon
+        self.window = window
+        self.queue_weight = queue_weight
+        self.margin = margin
+        self.clock = clock
+        self._history: dict[str, deque[tuple[float, int]]] = {}
+        self._latest: dict[str, Observation] = {}
+        self._latest_ts: Optional[float] = None
+
+    def observe(self, ts: float, observations: Iterable[Observation]) -> None:
+        self._latest = {o.instance_id: o for o in observations}
+        self._latest_ts = ts
+
+        for o in self._latest.values():
+            history = self._history.setdefault(o.instance_id, deque())
+            history.append((ts, o.users))
+            while history and history[0][0] < ts - self.window:
+                history.popleft()
+
+        # 一覧から消えたインスタンスの履歴は捨てる
+        for instance_id in self._history.keys() - self._latest.keys():
+            del self._history[instance_id]
+
+    def observe_index(self, index: InstanceIndex, ts: Optional[float] = None) -> None:
+        self.observe(
+            self.clock() if ts is None else ts,
+            (
+                Observation(
+                    i.instance_id,
+                    i.user_count,
+                    i.queue_size if i.queue_enabled else 0,
+                    i.closed_at.timestamp() if i.closed_at else None,
+                    i.world.capacity,
+                )
+                for i in index
+            ),
+        )
+
+    def on_event(self, event: InstanceEvent) -> None:
+        if isinstance(event, SnapshotUpdated):
+            self.observe_index(event.index)
+
+    def _trend(self, instance_id: str) -> float:
+        # 窓内の人数の最小二乗法による傾き [人/秒]
+        history = self._history.get(instance_id)
+        if not history or len(history) < 2:
+            return 0.0
+        n = len(history)
+        mean_t = sum(t for t, _ in history) / n
+        mean_u = sum(u for _, u in history) / n
+        var = sum((t - mean_t) ** 2 for t, _ in history)
+        if var == 0:
+            return 0.0
+        return sum((t - mean_t) * (u - mean_u) for t, u in history) / var
+
+    def predict(self) -> list[Forecast]:
+        if self._latest_ts is None:
+            return []
+        ts = self._latest_ts
+
+        forecasts = []
+        for o in self._latest.values():
+            trend = self._trend(o.instance_id)
+            closing = o.closes_at is not None and o.closes_at <= ts + self.horizon
+            if closing:
+                # クローズ後は増えないので減少傾向のみ反映する
+                predicted = o.users + min(trend, 0.0) * self.horizon
+            else:
+                # 待機列は空きが出れば入ってくる人数として加味する
+                predicted = o.users + trend * self.horizon + self.queue_weight * o.queue
+                if o.capacity is not None:
+                    predicted = min(predicted, o.capacity)
+            forecasts.append(
+                Forecast(
+                    o.instance_id,
+                    o.users,
+                    max(predicted, 0.0),
+                    trend * 60,
+                    o.queue,
+                    closing,
+                )
+            )
+        return sorted(forecasts, key=lambda f: (-f.predicted, -f.queue, -f.users))
+
+    def leader(self) -> Optional[Forecast]:
+        # 予測人数が最大のオープン中のインスタンス
+        return next((f for f in self.predict() if not f.closing), None)
+
+    def predicted_target(self, current: Optional[str]) -> Optional[Forecast]:
+        # 予測上の最大インスタンスが現在地を margin 人以上上回る場合、その移動先を返す
+        forecasts = self.predict()
+        leader = next((f for f in forecasts if not f.closing), None)
+        if leader is None or leader.instance_id == current:
+            return None
+
+        here = next((f for f in forecasts if f.instance_id == current), None)
+        if here is not None and leader.predicted - here.predicted < self.margin:
+            return None
+        return leader
+
+    def early_invite(
+        self, index: InstanceIndex, location: Optional[str]
+    ) -> Optional[InstanceSnapshot]:
+        # 予測に基づく先回りのInvite先 (参加可能なもののみ)
+        here = index.by_location(location)
+        if here is None:
+            return None
+
+        forecast = self.predicted_target(here.instance_id)
+        if forecast is None:
+            return None
+
+        target = next((i for i in index if i.instance_id == forecast.instance_id), None)
+        if target is None or not index.is_joinable(target):
+            return None
+        return target
@@ -0,0 +1,251 @@
+import sqlite3
+from typing import Collection, Final, Iterable, Optional, Sequence
+
+import numpy as np
+
+# 5分・1時間・1日ごとの集計 (日の区切りは日本時間)
+RESOLUTIONS: Final[tuple[int, ...]] = (300, 3600, 86400)
+JST_OFFSET: Final[int] = 9 * 3600
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    instance INTEGER NOT NULL,
+    samples INTEGER NOT NULL,
+    min_users INTEGER NOT NULL,
+    max_users INTEGER NOT NULL,
+    sum_users INTEGER NOT NULL,
+    top_samples INTEGER NOT NULL,
+    PRIMARY KEY (resolution, bucket, instance)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_ticks (
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    ticks INTEGER NOT NULL,
+    PRIMARY KEY (resolution, bucket)
+) WITHOUT ROWID;
+"""
+
+# (resolution, bucket, instance) -> [samples, min, max, sum, top_samples]
+Aggregates = dict[tuple[int, int, int], list[int]]
+# (resolution, bucket) -> 集計に含まれる時刻の数
+Ticks = dict[tuple[int, int], int]
+Bucket = tuple[int, int]  # (resolution, bucket)
+
+
+def bucket_start(ts: int, resolution: int) -> int:
+    return (ts + JST_OFFSET) // resolution * resolution - JST_OFFSET
+
+
+def aggregate(
+    ts: Sequence[int],
+    instance: Sequence[int],
+    users: Sequence[int],
+    closed: Sequence[bool],
+) -> tuple[Aggregates, Ticks]:
+    if not ts:
+        return {}, {}
+    ts = np.asarray(ts, dtype=np.int64)
+    instance = np.asarray(instance, dtype=np.int64)
+    users = np.asarray(users, dtype=np.int64)
+    is_open = ~np.asarray(closed, dtype=bool)
+
+    # 時刻ごとに オープン中 → 人数の多い順 → インスタンス番号順 に並べた先頭がトップ
+    order = np.lexsort((instance, -users, ~is_open, ts))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = ts[order][1:] != ts[order][:-1]
+    top = np.zeros(len(ts), dtype=np.int64)
+    top[order[first]] = is_open[order[first]]
+
+    unique_ts = np.unique(ts)
+    aggregates: Aggregates = {}
+    ticks: Ticks = {}
+    for resolution in RESOLUTIONS:
+        buckets, counts = np.unique(
+            (unique_ts + JST_OFFSET) // resolution * resolution - JST_OFFSET,
+            return_counts=True,
+        )
+        for b, c in zip(buckets.tolist(), counts.tolist()):
+            ticks[(resolution, b)] = c
+
+        bucket = (ts + JST_OFFSET) // resolution * resolution - JST_OFFSET
+        order = np.lexsort((instance, bucket))
+        b, inst, u, t = bucket[order], instance[order], users[order], top[order]
+        starts = np.flatnonzero(
+            np.concatenate(([True], (b[1:] != b[:-1]) | (inst[1:] != inst[:-1])))
+        )
+        rows = zip(
+            b[starts].tolist(),
+            inst[starts].tolist(),
+            np.diff(np.append(starts, len(order))).tolist(),
+            np.minimum.reduceat(u, starts).tolist(),
+            np.maximum.reduceat(u, starts).tolist(),
+            np.add.reduceat(u, starts).tolist(),
+            np.add.reduceat(t, starts).tolist(),
+        )
+        for bk, ik, n, lo, hi, total, tops in rows:
+            aggregates[(resolution, bk, ik)] = [n, lo, hi, total, tops]
+    return aggregates, ticks
+
+
+def buckets_of(ts: Iterable[int]) -> set[Bucket]:
+    return {(r, bucket_start(t, r)) for t in set(ts) for r in RESOLUTIONS}
+
+
+def apply_rollups(
+    conn: sqlite3.Connection,
+    rows: Sequence[tuple[int, int, int, bool]],
+    since: Optional[dict[int, int]] = None,
+    skip: Collection[Bucket] = (),
+) -> None:
+    # 新しいサンプル (instance, ts, users, closed) を既存の集計に加算する
+    # since を指定した場合は解像度ごとにその時刻より前の区間は更新しない
+    # skip の区間は更新しない (作り直す区間)
+    if not rows:
+        return
+    instance, ts, users, closed = zip(*rows)
+    aggregates, ticks = aggregate(ts, instance, users, closed)
+    if since is not None:
+        aggregates = {k: v for k, v in aggregates.items() if k[1] >= since[k[0]]}
+        ticks = {k: v for k, v in ticks.items() if k[1] >= since[k[0]]}
+    if skip:
+        aggregates = {k: v for k, v in aggregates.items() if k[:2] not in skip}
+        ticks = {k: v for k, v in ticks.items() if k not in skip}
+    _write_rollups(conn, aggregates, ticks)
+
+
+def refresh_rollups(
+    conn: sqlite3.Connection, buckets: Collection[Bucket], retained_since: int
+) -> None:
+    # 保存済みのサンプルを置き換えた区間の集計を生データから作り直す
+    # (最小・最大・最大インスタンスは差分では直せないため)
+    # retained_since より前の生データは削除済みの可能性があるので、その区間は残す
+    buckets = {(r, b) for r, b in buckets if b >= retained_since}
+    if not buckets:
+        return
+
+    for resolution, bucket in buckets:
+        conn.execute(
+            "DELETE FROM rollups WHERE resolution = ? AND bucket = ?",
+            (resolution, bucket),
+        )
+        conn.execute(
+            "DELETE FROM rollup_ticks WHERE resolution = ? AND bucket = ?",
+            (resolution, bucket),
+        )
+    rows = conn.execute(
+        "SELECT instance, ts, users, closed FROM samples WHERE ts >= ? AND ts < ?",
+        (min(b for _, b in buckets), max(b + r for r, b in buckets)),
+    ).fetchall()
+    if not rows:
+        return
+    instance, ts, users, closed = zip(*rows)
+    aggregates, ticks = aggregate(ts, instance, users, closed)
+    _write_rollups(
+        conn,
+        {k: v for k, v in aggregates.items() if k[:2] in buckets},
+        {k: v for k, v in ticks.items() if k in buckets},
+    )
+
+
+def _write_rollups(
+    conn: sqlite3.Connection, aggregates: Aggregates, ticks: Ticks
+) -> None:
+    conn.executemany(
+        "INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(resolution, bucket, instance) DO UPDATE SET "
+        "samples = samples + excluded.samples, "
+        "min_users = MIN(min_users, excluded.min_users), "
+        "max_users = MAX(max_users, excluded.max_users), "
+        "sum_users = sum_users + excluded.sum_users, "
+        "top_samples = top_samples + excluded.top_samples",
+        [(*key, *agg) for key, agg in aggregates.items()],
+    )
+    conn.executemany(
+        "INSERT INTO rollup_ticks VALUES (?, ?, ?) "
+        "ON CONFLICT(resolution, bucket) DO UPDATE SET ticks = ticks + excluded.ticks",
+        [(*key, n) for key, n in ticks.items()],
+    )
+
+
+def rebuild_rollups(conn: sqlite3.Connection, chunk: int = 86400 * 7) -> int:
+    # 生データから集計を作り直す (1週間ずつ読み込んでメモリ使用量を抑える)
+    start, end = conn.execute("SELECT MIN(ts), MAX(ts) FROM samples").fetchone()
+    if start is None:
+        return 0
+
+    # 生データが一部削除済みの区間の集計は残し、解像度ごとに
+    # 生データがすべて残っている最初の区間から作り直す
+    since = {r: -(-(start + JST_OFFSET) // r) * r - JST_OFFSET for r in RESOLUTIONS}
+    for resolution, bucket in since.items():
+        conn.execute(
+            "DELETE FROM rollups WHERE resolution = ? AND bucket >= ?",
+            (resolution, bucket),
+        )
+        conn.execute(
+            "DELETE FROM rollup_ticks WHERE resolution = ? AND bucket >= ?",
+            (resolution, bucket),
+        )
+    start = min(since.values())
+
+    total = 0
+    while start <= end:
+        rows = conn.execute(
+            "SELECT instance, ts, users, closed FROM samples "
+            "WHERE ts >= ? AND ts < ?",
+            (start, start + chunk),
+        ).fetchall()
+        apply_rollups(conn, rows, since)
+        total += len(rows)
+        start += chunk
+    return total
+
+
+# ---- レポート用 ----
+
+
+def hourly_peaks(
+    conn: sqlite3.Connection, start: int, end: int
+) -> list[tuple[int, int]]:
+    # 1時間ごとの最大インスタンスの最大人数 (bucket, users)
+    return conn.execute(
+        "SELECT bucket, MAX(max_users) FROM rollups "
+        "WHERE resolution = 3600 AND bucket BETWEEN ? AND ? "
+        "GROUP BY bucket ORDER BY bucket",
+        (start, end),
+    ).fetchall()
+
+
+def daily_summary(
+    conn: sqlite3.Connection, start: int, end: int
+) -> list[tuple[int, int, int, int, float]]:
+    # 日ごとの (bucket, インスタンス数, 最小人数, 最大人数, 平均人数)
+    return conn.execute(
+        "SELECT bucket, COUNT(*), MIN(min_users), MAX(max_users), "
+        "CAST(SUM(sum_users) AS REAL) / SUM(samples) FROM rollups "
+        "WHERE resolution = 86400 AND bucket BETWEEN ? AND ? "
+        "GROUP BY bucket ORDER BY bucket",
+        (start, end),
+    ).fetchall()
+
+
+def top_share(
+    conn: sqlite3.Connection, start: int, end: int, resolution: int = 3600
+) -> list[tuple[str, str, int, float]]:
+    # 期間中に最大インスタンスだった割合 (instance_id, name, top_samples, share)
+    ticks = conn.execute(
+        "SELECT COALESCE(SUM(ticks), 0) FROM rollup_ticks "
+        "WHERE resolution = ? AND bucket BETWEEN ? AND ?",
+        (resolution, start, end),
+    ).fetchone()[0]
+    rows = conn.execute(
+        "SELECT i.instance_id, i.name, SUM(r.top_samples) AS tops FROM rollups r "
+        "JOIN instances i ON i.id = r.instance "
+        "WHERE r.resolution = ? AND r.bucket BETWEEN ? AND ? "
+        "GROUP BY r.instance HAVING tops > 0 ORDER BY tops DESC",
+        (resolution, start, end),
+    ).fetchall()
+    return [
+        (iid, name, tops, tops / ticks if ticks else 0.0) for iid, name, tops in rows
+    ]
@@ -0,0 +1,273 @@
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from app.instance_events import InstanceEvent, SnapshotUpdated
+from app.model.snapshot import InstanceIndex
+from app.population_rollup import (
+    ROLLUP_SCHEMA,
+    apply_rollups,
+    buckets_of,
+    refresh_rollups,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS instances (
+    id INTEGER PRIMARY KEY,
+    instance_id TEXT NOT NULL UNIQUE,
+    world_id TEXT NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS samples (
+    instance INTEGER NOT NULL REFERENCES instances(id),
+    ts INTEGER NOT NULL,
+    users INTEGER NOT NULL,
+    queue INTEGER NOT NULL,
+    closed INTEGER NOT NULL,
+    capacity INTEGER,
+    closes_at INTEGER,
+    PRIMARY KEY (instance, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS samples_ts ON samples(ts);
+"""
+
+
+@dataclass(frozen=True)
+class Sample:
+    ts: int  # UNIX時間[秒]
+    instance_id: str
+    users: int
+    queue: int
+    closed: bool
+    capacity: Optional[int] = None
+    closes_at: Optional[int] = None  # クローズ(予定)時刻のUNIX時間[秒]
+
+
+class PopulationStore:
+    # インスタンス人数の履歴をSQLiteに保存する (書き込みはまとめて裏で行う)
+    def __init__(
+        self,
+        path: Path,
+        retention: float = 30 * 86400,
+        flush_interval: float = 60,
+        max_pending: int = 5000,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = path
+        self.retention = retention
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pending: list[
+            tuple[str, str, str, int, int, int, int, int, Optional[int]]
+        ] = []
+        self._ids: dict[str, int] = {}
+        self._last_prune: Optional[float] = None
+        self._wakeup = threading.Event()
+        self._closed = threading.Event()
+
+        self._conn = self._connect()
+        self._conn.executescript(SCHEMA + ROLLUP_SCHEMA)
+        self._migrate()
+        self._thread = threading.Thread(
+            target=self._run, name="population-store", daemon=True
+        )
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        # WALにして書き込み中でも他プロセス(GUI等)から読めるようにする
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _migrate(self) -> None:
+        # 以前に作成したDBには定員・クローズ時刻の列がないので追加する
+        columns = {r[1] for r in self._conn.execute("PRAGMA table_info(samples)")}
+        with self._conn:
+            for column in ("capacity", "closes_at"):
+                if column not in columns:
+                    self._conn.execute(
+                        f"ALTER TABLE samples ADD COLUMN {column} INTEGER"
+                    )
+
+    def record(self, index: InstanceIndex, ts: Optional[float] = None) -> None:
+        ts = int(self.clock() if ts is None else ts)
+        rows = [
+            (
+                i.instance_id,
+                i.world_id,
+                i.display_name or i.name,
+                ts,
+                i.user_count,
+                i.queue_size,
+                not index.is_open(i),
+                i.world.capacity,
+                int(i.closed_at.timestamp()) if i.closed_at else None,
+            )
+            for i in index
+        ]
+        with self._lock:
+            self._pending.extend(rows)
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wakeup.set()
+
+    def on_event(self, event: InstanceEvent) -> None:
+        if isinstance(event, SnapshotUpdated):
+            self.record(event.index)
+
+    def flush(self) -> int:
+        with self._lock:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return 0
+
+        with self._write_lock, self._conn:
+            for instance_id, world_id, name, *_ in rows:
+                if instance_id not in self._ids:
+                    self._conn.execute(
+                        "INSERT INTO instances (instance_id, world_id, name) VALUES (?, ?, ?) "
+                        "ON CONFLICT(instance_id) DO UPDATE SET name = excluded.name",
+                        (instance_id, world_id, name),
+                    )
+                    self._ids[instance_id] = self._conn.execute(
+                        "SELECT id FROM instances WHERE instance_id = ?",
+                        (instance_id,),
+                    ).fetchone()[0]
+            # 同じ秒に複数回記録された場合は最後のものを使う
+            samples = {
+                (self._ids[instance_id], ts): values
+                for instance_id, _, _, ts, *values in rows
+            }
+            # 保存済みのサンプルを置き換える分は加算せず、その区間を作り直す
+            existing = set(
+                self._conn.execute(
+                    "SELECT instance, ts FROM samples WHERE ts BETWEEN ? AND ?",
+                    (min(ts for _, ts in samples), max(ts for _, ts in samples)),
+                ).fetchall()
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO samples "
+                "(instance, ts, users, queue, closed, capacity, closes_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(*key, *value) for key, value in samples.items()],
+            )
+            # 集計も同じトランザクションで更新しておく
+            replaced = buckets_of(ts for _, ts in samples.keys() & existing)
+            apply_rollups(
+                self._conn,
+                [
+                    (instance, ts, users, closed)
+                    for (instance, ts), (users, _, closed, *_) in samples.items()
+                    if (instance, ts) not in existing
+                ],
+                skip=replaced,
+            )
+            refresh_rollups(self._conn, replaced, int(self.clock() - self.retention))
+        self._prune()
+        return len(rows)
+
+    def _prune(self) -> None:
+        # 保持期間を過ぎたデータは1時間に1回まとめて削除する
+        now = self.clock()
+        if self._last_prune is not None and now - self._last_prune < 3600:
+            return
+        self._last_prune = now
+
+        with self._write_lock, self._conn:
+            deleted = self._conn.execute(
+                "DELETE FROM samples WHERE ts < ?", (int(now - self.retention),)
+            ).rowcount
+            # 5分単位の集計は生データと同じ期間だけ残す (1時間・1日単位は残し続ける)
+            self._conn.execute(
+                "DELETE FROM rollups WHERE resolution = 300 AND bucket + 300 <= ?",
+                (int(now - self.retention),),
+            )
+            self._conn.execute(
+                "DELETE FROM rollup_ticks WHERE resolution = 300 AND bucket + 300 <= ?",
+                (int(now - self.retention),),
+            )
+            self._conn.execute(
+                "DELETE FROM instances WHERE id NOT IN (SELECT DISTINCT instance FROM samples) "
+                "AND id NOT IN (SELECT DISTINCT instance FROM rollups)"
+            )
+            self._ids.clear()
+        if deleted:
+            logging.debug(f"Pruned {deleted} population samples")
+
+    def _run(self) -> None:
+        while not self._closed.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logging.warning(f"⚠️ Failed to write population history: {e}")
+
+    def close(self) -> None:
+        self._closed.set()
+        self._wakeup.set()
+        self._thread.join()
+        try:
+            self.flush()
+        finally:
+            self._conn.close()
+
+    # ---- 参照用 ----
+
+    def _query(self, sql: str, params: tuple) -> list[tuple]:
+        # 読み込みは書き込み用とは別の接続で行う
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=10)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def population(
+        self, instance_id: str, start: float, end: Optional[float] = None
+    ) -> list[Sample]:
+        # 指定したインスタンスの人数の推移
+        end = self.clock() if end is None else end
+        rows = self._query(
+            "SELECT s.ts, s.users, s.queue, s.closed, s.capacity, s.closes_at "
+            "FROM samples s "
+            "JOIN instances i ON i.id = s.instance "
+            "WHERE i.instance_id = ? AND s.ts BETWEEN ? AND ? ORDER BY s.ts",
+            (instance_id, int(start), int(end)),
+        )
+        return [
+            Sample(ts, instance_id, users, queue, bool(closed), capacity, closes_at)
+            for ts, users, queue, closed, capacity, closes_at in rows
+        ]
+
+    def most_populated(self, start: float, end: Optional[float] = None) -> list[Sample]:
+        # 各時刻で最も人数の多かったオープン中のインスタンス
+        end = self.clock() if end is None else end
+        rows = self._query(
+            "SELECT s.ts, i.instance_id, MAX(s.users), s.queue, s.closed, "
+            "s.capacity, s.closes_at FROM samples s "
+            "JOIN instances i ON i.id = s.instance "
+            "WHERE s.ts BETWEEN ? AND ? AND s.closed = 0 "
+            "GROUP BY s.ts ORDER BY s.ts",
+            (int(start), int(end)),
+        )
+        return [
+            Sample(ts, instance_id, users, queue, bool(closed), capacity, closes_at)
+            for ts, instance_id, users, queue, closed, capacity, closes_at in rows
+        ]
+
+    def instance_ids(self, start: float, end: Optional[float] = None) -> list[str]:
+        end = self.clock() if end is None else end
+        rows = self._query(
+            "SELECT DISTINCT i.instance_id FROM samples s "
+            "JOIN instances i ON i.id = s.instance WHERE s.ts BETWEEN ? AND ?",
+            (int(start), int(end)),
+        )
+        return [r[0] for r in rows]
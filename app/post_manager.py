@@ -1,9 +1,12 @@
 import logging
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 from app.api.vrchat_api import VRChatAPI
 from app.model.vrchat import GroupPostInfo
 
+if TYPE_CHECKING:
+    from app.api.async_vrchat_api import AsyncVRChatAPI
+
 
 class PostManager:
     def __init__(self, vrc_api: VRChatAPI, group_id: str):
@@ -13,6 +16,15 @@ class PostManager:
 
     def check_new_post(self) -> Optional[GroupPostInfo]:
         posts = self.vrc_api.get_group_posts(self.group_id, n_count=1)
+        return self._detect(posts)
+
+    async def check_new_post_async(
+        self, api: "AsyncVRChatAPI"
+    ) -> Optional[GroupPostInfo]:
+        posts = await api.get_group_posts(self.group_id, n_count=1)
+        return self._detect(posts)
+
+    def _detect(self, posts: list[GroupPostInfo]) -> Optional[GroupPostInfo]:
         if not posts:
             return None
 
@@ -7,8 +7,10 @@ from app.model.instance.create import CreateInstanceConfig
 from app.model.instance_type import InstanceType
 from app.model.region import Region
 from app.model.group_access_type import GroupAccessType
-from app.model.vrchat import GroupRole, InstanceInfo
+from app.model.snapshot import InstanceSnapshot
+from app.model.vrchat import GroupRole
 from app.util.http import HttpClient
+from app.util.rate_limit import RateLimiter
 from app.util.auth import AuthManager
 from app.config import Config
 from app.util.launcher import VRCLauncher, LaunchOptions
@@ -17,7 +19,7 @@ from app.util.launcher import VRCLauncher, LaunchOptions
 class VRCService:
     def __init__(self):
         self.cfg = Config()
-        self.http = HttpClient()
+        self.http = HttpClient(rate_limiter=RateLimiter())
         self.auth = AuthManager(self.http, self.cfg)
         self.api = VRChatAPI(self.http, self.auth, self.cfg)
         self.launcher = VRCLauncher(manage_process=False)
@@ -32,7 +34,7 @@ class VRCService:
     def get_instance_info(self, world_id: str, instance_id: str):
         return self.api.get_instance_info(world_id, instance_id)
 
-    def close_instance(self, inst: InstanceInfo):
+    def close_instance(self, inst: InstanceSnapshot):
         self.api.close_instance(inst)
 
     def create_instance(
@@ -41,7 +43,7 @@ class VRCService:
         display_name: Optional[str],
         role_ids: Optional[list[str]],
         queue_enabled: Optional[bool],
-    ) -> InstanceInfo:
+    ) -> InstanceSnapshot:
         if display_name:
             timestamp = (
                 datetime.now(timezone.utc).astimezone(TZ).strftime("%Y%m%d_%H%M%S")
@@ -59,7 +61,7 @@ class VRCService:
             display_name=display_name,
         )
 
-        return self.api.create_instance(config)
+        return InstanceSnapshot.from_info(self.api.create_instance(config))
 
     def launch(self, instance, profile: int, extra_args: list[str]):
         self.launcher.launch(
@@ -70,7 +72,7 @@ class VRCService:
             )
         )
 
-    def get_launch_url(self, instance: InstanceInfo) -> str:
+    def get_launch_url(self, instance: InstanceSnapshot) -> str:
         return self.launcher.get_launch_url(instance)
 
     def get_group_roles(self, group_id: str) -> list[GroupRole]:
@@ -0,0 +1,264 @@
+import time
+import random
+import asyncio
+import inspect
+import contextvars
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+
+class TaskPending(Exception):
+    def __init__(self, name: str):
+        super().__init__(f"Task {name} has not finished yet")
+        self.name = name
+
+
+@dataclass
+class Task:
+    name: str
+    fn: Callable[[], Any]
+    interval: float
+    jitter: float = 0.0
+    depends_on: dict[str, float] = field(default_factory=dict)  # タスク名 -> 許容する経過秒数
+    lazy: bool = False  # Trueの場合は他のタスクから要求された時のみ実行
+    runs: int = 0
+    failures: int = 0
+    last_run: Optional[float] = None
+    last_success: Optional[float] = None
+    last_latency: Optional[float] = None
+    next_run: float = 0.0
+    result: Any = None
+
+
+class TaskScheduler:
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Callable[[], float] = random.random,
+        slack: float = 2.0,
+        max_workers: int = 4,
+        runner: Optional[asyncio.Runner] = None,
+    ):
+        self._clock = clock
+        self._rng = rng
+        self.slack = slack
+        self.max_workers = max_workers
+        self._tasks: dict[str, Task] = {}
+        self._inflight: dict[str, Future] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._runner = runner  # コルーチンを返すタスク用
+
+    def register(
+        self,
+        name: str,
+        fn: Callable[[], Any],
+        interval: float,
+        jitter: float = 0.0,
+        depends_on: Optional[dict[str, float]] = None,
+        lazy: bool = False,
+    ) -> Task:
+        if name in self._tasks:
+            raise ValueError(f"Task {name} is already registered")
+        for dep in depends_on or {}:
+            if dep not in self._tasks:
+                raise ValueError(f"Task {name} depends on unknown task {dep}")
+
+        task = Task(
+            name=name,
+            fn=fn,
+            interval=interval,
+            jitter=jitter,
+            depends_on=dict(depends_on or {}),
+            lazy=lazy,
+        )
+        self._tasks[name] = task
+        return task
+
+    def get(self, name: str) -> Task:
+        return self._tasks[name]
+
+    def result(self, name: str) -> Any:
+        return self._tasks[name].result
+
+    def age(self, name: str) -> Optional[float]:
+        task = self._tasks[name]
+        if task.last_success is None:
+            return None
+        return self._clock() - task.last_success
+
+    def is_due(self, name: str) -> bool:
+        # tick側の時刻の揺らぎで1周期飛ばさないよう、slack秒前から実行可能とする
+        return self._clock() >= self._tasks[name].next_run - self.slack
+
+    def is_running(self, name: str) -> bool:
+        return name in self._inflight
+
+    def ensure_fresh(self, name: str, max_age: float) -> Any:
+        # 指定秒数より古い(または未取得の)場合のみ実行する
+        age = self.age(name)
+        if age is None or age > max_age:
+            if self.is_running(name):
+                # 前のtickから実行中の場合は重複して実行せず前回の結果を使う
+                logging.warning(f"⚠️ Task {name} is still running, using previous result")
+                return self._tasks[name].result
+            return self.run(name)
+        return self._tasks[name].result
+
+    def run(self, name: str) -> Any:
+        task = self._tasks[name]
+        if self.is_running(name):
+            raise TaskPending(name)
+
+        for dep, max_age in task.depends_on.items():
+            if self.is_running(dep):
+                raise TaskPending(dep)
+            self.ensure_fresh(dep, max_age)
+
+        return self._execute(task)
+
+    def _execute(self, task: Task) -> Any:
+        started = self._clock()
+        try:
+            result = task.fn()
+            if inspect.isawaitable(result):
+                if self._runner is None:
+                    raise RuntimeError(f"Task {task.name} is async but no runner is set")
+                result = self._runner.run(result)
+            task.result = result
+            task.last_success = started
+        except Exception:
+            task.failures += 1
+            raise
+        finally:
+            self._record(task, started)
+
+        return task.result
+
+    async def _execute_async(self, task: Task) -> Any:
+        started = self._clock()
+        try:
+            result = task.fn()
+            if inspect.isawaitable(result):
+                result = await result
+            task.result = result
+            task.last_success = started
+        except BaseException:
+            task.failures += 1
+            raise
+        finally:
+            self._record(task, started)
+
+        return task.result
+
+    def _record(self, task: Task, started: float) -> None:
+        finished = self._clock()
+        task.runs += 1
+        task.last_run = started
+        task.last_latency = finished - started
+        task.next_run = started + task.interval + task.jitter * self._rng()
+        logging.debug(f"Task {task.name} took {task.last_latency:.2f}s")
+
+    def run_due(self) -> list[str]:
+        # 登録順に期限が来たタスクを実行 (失敗しても他のタスクは実行する)
+        ran: list[str] = []
+        for name, task in self._tasks.items():
+            if task.lazy or self.is_running(name) or not self.is_due(name):
+                continue
+            try:
+                self.run(name)
+                ran.append(name)
+            except TaskPending as e:
+                logging.warning(f"⚠️ Task {name} skipped: {e}")
+            except Exception as e:
+                logging.exception(f"Task {name} failed: {e}")
+        return ran
+
+    def run_parallel(self, names: list[str], timeout: float) -> list[str]:
+        # 独立したタスクを並列に実行し、timeout秒まで待つ (間に合わなかったタスク名を返す)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="task"
+            )
+
+        futures: dict[str, Future] = {}
+        for name in names:
+            if self.is_running(name):
+                continue
+            # 呼び出し元のコンテキスト(tickの期限・優先度)を引き継ぐ
+            # (待ちきれずに戻った後もワーカーは同じ期限で打ち切られる)
+            context = contextvars.copy_context()
+            future = self._executor.submit(context.run, self._execute, self._tasks[name])
+            self._inflight[name] = future
+            future.add_done_callback(lambda _, n=name: self._inflight.pop(n, None))
+            futures[name] = future
+
+        wait(futures.values(), timeout=timeout)
+
+        late: list[str] = []
+        for name, future in futures.items():
+            if not future.done():
+                late.append(name)
+            elif (e := future.exception()) is not None:
+                logging.error(f"Task {name} failed: {e!r}")
+
+        if late:
+            logging.warning(
+                f"⏳ Tick deadline ({timeout:.0f}s) exceeded, still waiting for: {', '.join(late)}"
+            )
+        return late
+
+    def run_concurrent(self, names: list[str], timeout: float) -> list[str]:
+        # コルーチンのタスクを同じイベントループで並行実行し、timeout秒で打ち切る
+        if self._runner is None:
+            raise RuntimeError("run_concurrent requires a runner")
+
+        async def gather() -> list[str]:
+            jobs = {
+                name: asyncio.ensure_future(self._execute_async(self._tasks[name]))
+                for name in names
+            }
+            if not jobs:
+                return []
+            await asyncio.wait(jobs.values(), timeout=timeout)
+
+            late: list[str] = []
+            for name, job in jobs.items():
+                if not job.done():
+                    job.cancel()
+                    late.append(name)
+            await asyncio.gather(*jobs.values(), return_exceptions=True)
+
+            for name, job in jobs.items():
+                if name not in late and (e := job.exception()) is not None:
+                    logging.error(f"Task {name} failed: {e!r}")
+            return late
+
+        late = self._runner.run(gather())
+        if late:
+            logging.warning(
+                f"⏳ Tick deadline ({timeout:.0f}s) exceeded, cancelled: {', '.join(late)}"
+            )
+        return late
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def skipped(self) -> list[str]:
+        # 期限は来ているが今回のtickで要求されなかった遅延タスク
+        return [
+            name for name, task in self._tasks.items() if task.lazy and self.is_due(name)
+        ]
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {
+            t.name: {
+                "runs": t.runs,
+                "failures": t.failures,
+                "last_latency": t.last_latency,
+            }
+            for t in self._tasks.values()
+        }
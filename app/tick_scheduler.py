@@ -0,0 +1,70 @@
+import time
+import logging
+from enum import StrEnum
+from typing import Callable, Optional
+
+
+class TickState(StrEnum):
+    FAST = "fast"  # 移動中・ロスコネ中
+    NORMAL = "normal"  # 通常時
+    SLOW = "slow"  # 再起動を諦めて手動対応待ち
+
+
+class TickScheduler:
+    def __init__(
+        self,
+        fast: float = 15,
+        normal: float = 60,
+        slow: float = 300,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.intervals: dict[TickState, float] = {
+            TickState.FAST: fast,
+            TickState.NORMAL: normal,
+            TickState.SLOW: slow,
+        }
+        self._clock = clock
+        self._sleep = sleep
+        self._scheduled: Optional[float] = None
+        self.state = TickState.NORMAL
+        self.ticks = 0
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+
+    def start(self) -> None:
+        self._scheduled = self._clock()
+        self.ticks = 1
+
+    def wait(self, state: TickState) -> None:
+        if self._scheduled is None:
+            self.start()
+            return
+
+        if state != self.state:
+            logging.info(f"ℹ️ Tick cadence changed: {self.state} -> {state}")
+            self.state = state
+
+        interval = self.intervals[state]
+        target = self._scheduled + interval
+
+        delay = target - self._clock()
+        if delay > 0:
+            self._sleep(delay)
+
+        started = self._clock()
+        lateness = max(0.0, started - target)
+        self.last_lateness = lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+        self.ticks += 1
+
+        # 処理が周期を超えた場合は現在時刻を基準にし直す (遅れを取り戻すための連続実行はしない)
+        if lateness >= interval:
+            logging.warning(
+                f"⚠️ Tick overran its period by {lateness:.1f}s ({state}={interval:.0f}s)"
+            )
+            self._scheduled = started
+        else:
+            self._scheduled = target
+
+        logging.debug(f"Tick #{self.ticks} ({state}) lateness={lateness:.3f}s")
@@ -1,4 +1,6 @@
+import time
 import logging
+from typing import Callable, Optional
 
 from app.api.patlite_api import (
     PatliteAPI,
@@ -11,22 +13,43 @@ from app.model.vrchat import UserInfo
 
 
 class TravelingMonitor:
-    def __init__(self, pl_api: PatliteAPI, max_attempts: int = 3):
+    def __init__(
+        self,
+        pl_api: PatliteAPI,
+        timeout: float = 180,
+        clock: Callable[[], float] = time.monotonic,
+    ):
         self.pl_api = pl_api
         self.traveling_count = 0
-        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.clock = clock
+        self._traveling_since: Optional[float] = None
+
+    @property
+    def is_traveling(self) -> bool:
+        return self._traveling_since is not None
 
     def check(self, user_info: UserInfo) -> bool:
         if user_info.traveling_to_location is not None:
+            now = self.clock()
+            if self._traveling_since is None:
+                self._traveling_since = now
             self.traveling_count += 1
-            logging.warning(f"⚠️ User is traveling... attempt {self.traveling_count}")
 
-            if self.traveling_count >= self.max_attempts:
+            elapsed = now - self._traveling_since
+            logging.warning(
+                f"⚠️ User is traveling... attempt {self.traveling_count} ({elapsed:.0f}s)"
+            )
+
+            if elapsed >= self.timeout:
                 logging.error("❌ Traveling timeout exceeded.")
                 self._notify()
+                # 再起動後もしばらくは移動中のままの応答が返るので、次の判定はtimeout秒後にする
+                self._traveling_since = now
                 return True
         else:
             self.traveling_count = 0
+            self._traveling_since = None
 
         return False
 
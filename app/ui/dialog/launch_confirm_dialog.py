@@ -1,11 +1,11 @@
 import tkinter as tk
 from tkinter import ttk
 
-from app.model.vrchat import InstanceInfo
+from app.model.snapshot import InstanceSnapshot
 
 
 class LaunchConfirmDialog(tk.Toplevel):
-    def __init__(self, parent, inst: InstanceInfo, profile: int):
+    def __init__(self, parent, inst: InstanceSnapshot, profile: int):
         super().__init__(parent)
         self.title("確認")
         self.resizable(False, False)
@@ -4,7 +4,7 @@ import tkinter.font as tkFont
 from tkinter import ttk, messagebox
 
 from app.const.group import GROUPNAME_MAP, TZ
-from app.model.vrchat import InstanceInfo
+from app.model.snapshot import InstanceSnapshot
 from app.ui.header_view import HeaderView
 from app.ui.instance_table_view import InstanceTableView
 from app.ui.dialog.create_instance_dialog import CreateInstanceDialog
@@ -173,7 +173,7 @@ class InstanceViewerApp:
 
         self.confirm_instance_launch(inst, profile, args)
 
-    def confirm_instance_launch(self, inst: InstanceInfo, profile: int, args):
+    def confirm_instance_launch(self, inst: InstanceSnapshot, profile: int, args):
         dlg = LaunchConfirmDialog(self.root, inst=inst, profile=profile)
         self.root.wait_window(dlg)
 
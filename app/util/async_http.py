@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import httpx
+
+from app.util.http import DeadlineExceeded, EndpointClass, HttpClient
+from app.util.rate_limit import parse_retry_after
+
+
+class AsyncHttpClient:
+    RETRY_STATUS = (500, 502, 503, 504)
+    RETRY_METHODS = ("HEAD", "GET", "OPTIONS", "POST")
+
+    def __init__(
+        self,
+        http: HttpClient,
+        max_connections: int = 10,
+        max_retries: int = 5,
+        backoff_factor: float = 1,
+    ) -> None:
+        # タイムアウト・レート制限・統計・Cookieは同期クライアントと共有する
+        self.http = http
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.client = httpx.AsyncClient(
+            headers=HttpClient.DEFAULT_HEADERS,
+            cookies=http.session.cookies,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def _backoff(self, attempt: int) -> None:
+        wait = self.backoff_factor * (2 ** (attempt - 1))
+        remaining = self.http.remaining()
+        if remaining is not None and wait >= remaining:
+            self.http.stats.inc("budget_exhausted")
+            raise DeadlineExceeded(
+                f"Retry wait {wait:.1f}s exceeds remaining budget {remaining:.1f}s"
+            )
+        await asyncio.sleep(wait)
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        endpoint: EndpointClass = EndpointClass.API,
+        **kwargs,
+    ) -> httpx.Response:
+        timeout = kwargs.pop("timeout", None)
+        retries = 0
+        rate_limited = 0
+
+        while True:
+            await asyncio.to_thread(self.http.acquire, method, url, endpoint)
+            connect, read = self.http.request_timeout(method, url, endpoint, timeout)
+
+            self.http.stats.inc("requests")
+            try:
+                resp = await self.client.request(
+                    method, url, timeout=httpx.Timeout(read, connect=connect), **kwargs
+                )
+            except httpx.TimeoutException:
+                self.http.stats.inc("timeouts")
+                logging.warning(f"⚠️ Request timed out: {method} {url}")
+                if method in self.RETRY_METHODS and retries < self.max_retries:
+                    retries += 1
+                    await self._backoff(retries)
+                    continue
+                raise
+
+            if resp.status_code == 429:
+                if self.http.rate_limiter is not None and (
+                    rate_limited < self.http.max_rate_limit_retries
+                ):
+                    rate_limited += 1
+                    self.http.stats.inc("rate_limited")
+                    self.http.rate_limiter.cooldown(
+                        parse_retry_after(resp.headers.get("Retry-After"))
+                    )
+                    continue
+            elif (
+                resp.status_code in self.RETRY_STATUS
+                and method in self.RETRY_METHODS
+                and retries < self.max_retries
+            ):
+                retries += 1
+                await self._backoff(retries)
+                continue
+
+            break
+
+        resp.raise_for_status()
+        return resp
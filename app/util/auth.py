@@ -4,11 +4,15 @@ import pyotp
 import json
 import os
 import time
-from typing import Final
+import threading
+from typing import Callable, Final, Optional
+from urllib.parse import urlparse
 from requests.auth import HTTPBasicAuth
 
 from app.config import Config
-from app.util.http import HttpClient
+from app.util.http import EndpointClass, HttpClient
+from app.util.fs import FileLock, write_json_atomic
+from app.util.metrics import Counters
 from app.model.vrchat import AuthVerifyResponse
 
 
@@ -19,19 +23,35 @@ class AuthError(Exception):
 class AuthManager:
     AUTH_DOMAIN: Final[str] = "api.vrchat.cloud"
     AUTH_COOKIE: Final[str] = "auth"
-
-    def __init__(self, http: HttpClient, config: Config) -> None:
+    LOGIN_LOCK_TIMEOUT: Final[float] = 120
+
+    def __init__(
+        self,
+        http: HttpClient,
+        config: Config,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
         self.http = http
         self.config = config
         self.cookie_file = config.cookie_file
+        self.lock_file = config.cookie_file.with_suffix(".lock")
         self.session = http.session
+        self.auth_domain = urlparse(config.base_url).hostname or self.AUTH_DOMAIN
+        self.session_trust = config.session_trust
+        self.clock = clock
+        self.stats = Counters()
+        self._verified_at: Optional[float] = None
+        self._saved_cookies: Optional[list[dict]] = None
+        self._save_lock = threading.Lock()
+        self._login_lock = threading.Lock()
+        self._login_generation = 0  # ログイン・セッションの引き継ぎに成功した回数
 
     @staticmethod
     def generate_totp(secret: str) -> str:
         totp = pyotp.TOTP(secret.replace(" ", ""))
         return totp.now()
 
-    def save_session(self) -> None:
+    def _cookies(self) -> list[dict]:
         cookies = []
         for cookie in self.session.cookies:
             cookies.append(
@@ -44,29 +64,59 @@ class AuthManager:
                     "expires": cookie.expires,
                 }
             )
-        with open(self.cookie_file, "w", encoding="utf-8") as f:
-            json.dump(cookies, f, ensure_ascii=False)
+        return cookies
+
+    def save_session(self) -> None:
+        # 保存に失敗してもリクエスト自体は成功しているので警告のみ (次回の変更確認で再試行)
+        with self._save_lock:
+            cookies = self._cookies()
+            try:
+                write_json_atomic(self.cookie_file, cookies)
+            except OSError as e:
+                logging.warning(f"⚠️ Failed to save session {self.cookie_file}: {e}")
+                return
+            self._saved_cookies = cookies
+
+    def save_if_changed(self) -> None:
+        # Cookieが更新された場合はすぐに保存しておく (異常終了しても再ログイン不要)
+        if self._cookies() != self._saved_cookies:
+            self.save_session()
 
     def load_session(self) -> None:
         if not os.path.exists(self.cookie_file):
             return
 
-        with open(self.cookie_file, "r", encoding="utf-8") as f:
-            cookies = json.load(f)
-            for c in cookies:
-                self.session.cookies.set(
-                    name=c["name"],
-                    value=c["value"],
-                    domain=c["domain"],
-                    path=c.get("path", "/"),
-                    secure=c.get("secure", False),
-                    expires=c.get("expires"),
-                )
+        try:
+            with open(self.cookie_file, "r", encoding="utf-8") as f:
+                cookies = json.load(f)
+        except ValueError as e:
+            logging.warning(f"⚠️ Failed to load session {self.cookie_file}: {e}")
+            return
+
+        for c in cookies:
+            self.session.cookies.set(
+                name=c["name"],
+                value=c["value"],
+                domain=c["domain"],
+                path=c.get("path", "/"),
+                secure=c.get("secure", False),
+                expires=c.get("expires"),
+            )
+        self._saved_cookies = self._cookies()
+
+    def _auth_cookie(self) -> Optional[str]:
+        for cookie in self.session.cookies:
+            if (
+                cookie.domain.lstrip(".") == self.auth_domain.lstrip(".")
+                and cookie.name == self.AUTH_COOKIE
+            ):
+                return cookie.value
+        return None
 
     def has_valid_cookie(self) -> bool:
         now = time.time()
         for cookie in self.session.cookies:
-            if cookie.domain.lstrip(".") == self.AUTH_DOMAIN.lstrip(".") and cookie.name == self.AUTH_COOKIE:
+            if cookie.domain.lstrip(".") == self.auth_domain.lstrip(".") and cookie.name == self.AUTH_COOKIE:
                 if cookie.expires is None or cookie.expires > now:
                     return True
                 else:
@@ -76,13 +126,32 @@ class AuthManager:
         return False
 
 
+    def mark_verified(self) -> None:
+        # 認証が必要なリクエストが成功した = セッションは有効
+        self._verified_at = self.clock()
+        self.save_if_changed()
+
+    def is_recently_verified(self) -> bool:
+        if self._verified_at is None:
+            return False
+        return self.clock() - self._verified_at < self.session_trust
+
     def ensure_logged_in(self) -> bool:
         if not self.has_valid_cookie():
             return self.login()
 
+        # 直近で確認済みのセッションは信用する (失効は各APIの401で検知して再ログイン)
+        if self.is_recently_verified():
+            self.stats.inc("trusted")
+            return True
+
         try:
-            resp = self.http.request("GET", f"{self.config.BASE_URL}/auth/user")
+            self.stats.inc("verifications")
+            resp = self.http.request(
+                "GET", f"{self.config.base_url}/auth/user", endpoint=EndpointClass.AUTH
+            )
             resp.raise_for_status()
+            self.mark_verified()
             return True
         except requests.HTTPError as e:
             if e.response is not None and e.response.status_code == 401:
@@ -93,10 +162,55 @@ class AuthManager:
             return False
 
     def login(self) -> bool:
+        # 同じアカウントを使う他スレッド・他プロセス(bot/GUI)と同時にログインしないよう排他する
+        generation = self._login_generation
+        try:
+            with (
+                self._login_lock,
+                FileLock(self.lock_file, timeout=self.LOGIN_LOCK_TIMEOUT),
+            ):
+                # 待っている間に同じプロセスの他スレッドがログインしていればそのまま使う
+                if self._login_generation != generation:
+                    self.stats.inc("shared")
+                    return True
+                if self._adopt_saved_session() or self._login():
+                    self._login_generation += 1
+                    return True
+                return False
+        except TimeoutError as e:
+            logging.error(f"❌️ {e}")
+            return False
+
+    def _adopt_saved_session(self) -> bool:
+        # 待っている間に他プロセスがログインしていればそのセッションを使う
+        current = self._auth_cookie()
+        self.load_session()
+        if self._auth_cookie() in (None, current) or not self.has_valid_cookie():
+            return False
+
+        try:
+            self.stats.inc("verifications")
+            resp = self.http.request(
+                "GET", f"{self.config.base_url}/auth/user", endpoint=EndpointClass.AUTH
+            )
+            resp.raise_for_status()
+        except Exception as e:
+            logging.info(f"ℹ️ Saved session is not usable: {e}")
+            return False
+
+        logging.info("ℹ️ Reusing the session saved by another process")
+        self.stats.inc("adopted")
+        self.mark_verified()
+        return True
+
+    def _login(self) -> bool:
+        self._verified_at = None
+        self.stats.inc("logins")
         try:
             response = self.http.request(
                 "GET",
-                f"{self.config.BASE_URL}/auth/user",
+                f"{self.config.base_url}/auth/user",
+                endpoint=EndpointClass.AUTH,
                 auth=HTTPBasicAuth(self.config.username, self.config.password),
             )
             response.raise_for_status()
@@ -113,7 +227,8 @@ class AuthManager:
             current_otp = self.generate_totp(self.config.totp_secret)
             verify_resp = self.http.request(
                 "POST",
-                f"{self.config.BASE_URL}/auth/twofactorauth/totp/verify",
+                f"{self.config.base_url}/auth/twofactorauth/totp/verify",
+                endpoint=EndpointClass.AUTH,
                 data={"code": current_otp},
             )
             verify_resp.raise_for_status()
@@ -123,6 +238,7 @@ class AuthManager:
                 logging.error("TOTP verification failed")
                 return False
 
+            self.mark_verified()
             return True
 
         except Exception as e:
@@ -0,0 +1,37 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Generic, Optional, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+@dataclass(frozen=True)
+class FetchResult(Generic[K, V]):
+    key: K
+    value: Optional[V] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def fetch_all(
+    fn: Callable[[K], V], keys: list[K], max_workers: int = 1
+) -> list[FetchResult[K, V]]:
+    # 入力順を維持したまま並列に取得する (失敗は個別に記録)
+    def run(key: K) -> FetchResult[K, V]:
+        try:
+            return FetchResult(key, value=fn(key))
+        except Exception as e:
+            return FetchResult(key, error=e)
+
+    if max_workers <= 1 or len(keys) <= 1:
+        return [run(k) for k in keys]
+
+    # 呼び出し元のコンテキスト(リクエストの優先度など)をワーカーに引き継ぐ
+    contexts = [contextvars.copy_context() for _ in keys]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(keys))) as executor:
+        return list(executor.map(lambda c, k: c.run(run, k), contexts, keys))
@@ -0,0 +1,83 @@
+import os
+import sys
+import json
+import time
+from pathlib import Path
+from typing import Any, Optional, Union
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+
+def write_json_atomic(path: Union[str, Path], obj: Any) -> None:
+    # 書き込み途中で落ちても壊れたファイルが残らないよう一時ファイルから置き換える
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(obj, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+class FileLock:
+    # 同じファイルを使う複数プロセス間の排他ロック
+    def __init__(
+        self, path: Union[str, Path], timeout: float = 60, poll: float = 0.1
+    ) -> None:
+        self.path = Path(path)
+        self.timeout = timeout
+        self.poll = poll
+        self._file = None
+
+    def acquire(self) -> None:
+        f = open(self.path, "a+b")
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                self._lock(f)
+                self._file = f
+                return
+            except OSError:
+                if time.monotonic() >= deadline:
+                    f.close()
+                    raise TimeoutError(f"Timed out waiting for lock {self.path}")
+                time.sleep(self.poll)
+
+    def release(self) -> None:
+        f, self._file = self._file, None
+        if f is None:
+            return
+        try:
+            self._unlock(f)
+        finally:
+            f.close()
+
+    @staticmethod
+    def _lock(f) -> None:
+        if sys.platform == "win32":
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    @staticmethod
+    def _unlock(f) -> None:
+        if sys.platform == "win32":
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc: Optional[BaseException]) -> None:
+        self.release()
@@ -1,8 +1,62 @@
+import time
+import logging
 import requests
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import StrEnum
+from typing import Iterator, Optional
+from urllib.parse import urlparse
 from requests import Session
 from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ReadTimeoutError
 from urllib3.util.retry import Retry
 
+from app.util.metrics import Counters
+from app.util.rate_limit import RateLimiter, parse_retry_after
+
+# 呼び出し元のtickの期限 (time.monotonic()基準、並列実行のワーカーにも引き継がれる)
+current_deadline: ContextVar[Optional[float]] = ContextVar(
+    "current_deadline", default=None
+)
+
+
+class EndpointClass(StrEnum):
+    API = "api"  # VRChat API
+    AUTH = "auth"  # VRChat 認証
+    DEVICE = "device"  # LAN内の機器 (パトライト)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class BudgetRetry(Retry):
+    # 残り時間内に待機が終わらない場合はリトライせずに打ち切る
+    def __init__(self, *args, client: Optional["HttpClient"] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.client = client
+
+    def new(self, **kw) -> "BudgetRetry":
+        retry = super().new(**kw)
+        retry.client = self.client
+        return retry
+
+    def sleep(self, response=None) -> None:
+        if self.client is not None:
+            remaining = self.client.remaining()
+            if remaining is not None:
+                wait = None
+                if self.respect_retry_after_header and response is not None:
+                    wait = self.get_retry_after(response)
+                if wait is None:
+                    wait = self.get_backoff_time()
+                if wait >= remaining:
+                    self.client.stats.inc("budget_exhausted")
+                    raise DeadlineExceeded(
+                        f"Retry wait {wait:.1f}s exceeds remaining budget {remaining:.1f}s"
+                    )
+        super().sleep(response)
+
 
 class HttpClient:
 
@@ -13,19 +67,42 @@ class HttpClient:
         )
     }
 
-    def __init__(self) -> None:
+    # (connect, read) 秒
+    DEFAULT_TIMEOUTS: dict[EndpointClass, tuple[float, float]] = {
+        EndpointClass.API: (5, 15),
+        EndpointClass.AUTH: (5, 15),
+        EndpointClass.DEVICE: (2, 5),
+    }
+
+    def __init__(
+        self,
+        timeouts: Optional[dict[EndpointClass, tuple[float, float]]] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_rate_limit_retries: int = 2,
+    ) -> None:
+        self.timeouts = {**self.DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.rate_limiter = rate_limiter
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self.stats = Counters()
         self.session = self._create_session()
 
     def _create_session(self) -> Session:
         session = requests.session()
         session.headers.update(self.DEFAULT_HEADERS)
 
-        retry_strategy = Retry(
+        # 429はRateLimiterがあればそちらで全体のクールダウンとして扱う
+        status_forcelist = [500, 502, 503, 504]
+        if self.rate_limiter is None:
+            status_forcelist.append(429)
+
+        retry_strategy = BudgetRetry(
             total=5,
             backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
+            status_forcelist=status_forcelist,
             allowed_methods=["HEAD", "GET", "OPTIONS", "POST"],
             raise_on_status=False,
+            respect_retry_after_header=self.rate_limiter is None,
+            client=self,
         )
         adapter = HTTPAdapter(max_retries=retry_strategy)
         session.mount("http://", adapter)
@@ -33,7 +110,106 @@ class HttpClient:
 
         return session
 
-    def request(self, method: str, url: str, **kwargs) -> requests.Response:
-        resp = self.session.request(method, url, **kwargs)
+    @contextmanager
+    def deadline(self, seconds: float) -> Iterator[None]:
+        # この範囲内のリクエストはseconds秒以内に終えるようにする (入れ子の場合は短い方を優先)
+        # 他スレッドの期限とは独立 (スレッド・コンテキストごとに保持する)
+        previous = current_deadline.get()
+        deadline = time.monotonic() + seconds
+        token = current_deadline.set(
+            deadline if previous is None else min(previous, deadline)
+        )
+        try:
+            yield
+        finally:
+            current_deadline.reset(token)
+
+    def remaining(self) -> Optional[float]:
+        deadline = current_deadline.get()
+        if deadline is None:
+            return None
+        return deadline - time.monotonic()
+
+    @staticmethod
+    def endpoint_family(url: str) -> str:
+        # /api/1/instances/... -> "instances"
+        segments = [seg for seg in urlparse(url).path.split("/") if seg]
+        for i, seg in enumerate(segments[:-1]):
+            if seg.isdigit():
+                return segments[i + 1]
+        return segments[0] if segments else ""
+
+    def acquire(self, method: str, url: str, endpoint: EndpointClass) -> None:
+        if self.rate_limiter is None or endpoint == EndpointClass.DEVICE:
+            return
+        if not self.rate_limiter.acquire(
+            self.endpoint_family(url), timeout=self.remaining()
+        ):
+            self.stats.inc("budget_exhausted")
+            raise DeadlineExceeded(f"Rate limit wait exceeds budget for {method} {url}")
+
+    def request_timeout(
+        self,
+        method: str,
+        url: str,
+        endpoint: EndpointClass,
+        timeout: Optional[tuple[float, float]] = None,
+    ) -> tuple[float, float]:
+        connect, read = timeout or self.timeouts[endpoint]
+
+        # LAN内の機器への通知はtickの予算切れでも送る (操作者への警告を落とさない)
+        if endpoint == EndpointClass.DEVICE:
+            return connect, read
+
+        remaining = self.remaining()
+        if remaining is not None:
+            if remaining <= 0:
+                self.stats.inc("budget_exhausted")
+                raise DeadlineExceeded(f"No time budget left for {method} {url}")
+            connect, read = min(connect, remaining), min(read, remaining)
+        return connect, read
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        endpoint: EndpointClass = EndpointClass.API,
+        **kwargs,
+    ) -> requests.Response:
+        timeout = kwargs.pop("timeout", None)
+
+        for _ in range(self.max_rate_limit_retries + 1):
+            self.acquire(method, url, endpoint)
+
+            self.stats.inc("requests")
+            try:
+                resp = self.session.request(
+                    method,
+                    url,
+                    timeout=self.request_timeout(method, url, endpoint, timeout),
+                    **kwargs,
+                )
+            except requests.Timeout:
+                self.stats.inc("timeouts")
+                logging.warning(f"⚠️ Request timed out: {method} {url}")
+                raise
+            except requests.ConnectionError as e:
+                # リトライ後の読み込みタイムアウトはConnectionErrorとして返ってくる
+                reason = e.args[0] if e.args else None
+                if isinstance(reason, MaxRetryError) and isinstance(
+                    reason.reason, ReadTimeoutError
+                ):
+                    self.stats.inc("timeouts")
+                    logging.warning(f"⚠️ Request timed out: {method} {url}")
+                raise
+
+            if resp.status_code != 429 or self.rate_limiter is None:
+                break
+
+            self.stats.inc("rate_limited")
+            self.rate_limiter.cooldown(
+                parse_retry_after(resp.headers.get("Retry-After"))
+            )
+
         resp.raise_for_status()
         return resp
@@ -10,7 +10,7 @@ from typing import Final
 from typing import Optional
 from dataclasses import dataclass
 
-from app.model.vrchat import InstanceInfo
+from app.model.snapshot import InstanceSnapshot
 
 
 @dataclass(frozen=True)
@@ -22,7 +22,7 @@ class OscConfig:
 
 @dataclass(frozen=True)
 class LaunchOptions:
-    instance: Optional[InstanceInfo] = None
+    instance: Optional[InstanceSnapshot] = None
     profile: Optional[int] = None
     no_vr: bool = True
     fps: Optional[int] = None
@@ -76,6 +76,12 @@ class VRCLauncher:
         if self.manage_process:
             self._rollup_exist_process()
 
+    def attach(self) -> bool:
+        # 手動で起動されたVRChatにアタッチし直す
+        if not self.is_running:
+            self._rollup_exist_process()
+        return self.is_running
+
     def launch(self, options: LaunchOptions):
         args = [str(self.launcher_path)]
 
@@ -213,7 +219,7 @@ class VRCLauncher:
             return None
         return None
 
-    def get_launch_url(self, instance: InstanceInfo) -> str:
+    def get_launch_url(self, instance: InstanceSnapshot) -> str:
         return (
             f"vrchat://launch?"
             f"ref=VRCQuickLauncher"
@@ -1,3 +1,4 @@
+import json
 import logging
 from pathlib import Path
 from datetime import datetime
@@ -19,3 +20,12 @@ def setup_logger():
         ],
         force=True,
     )
+
+
+def debug_json(data) -> None:
+    # ダンプ文字列の生成はDEBUGログが有効な場合のみ行う
+    if not logging.getLogger().isEnabledFor(logging.DEBUG):
+        return
+    if isinstance(data, (bytes, str)):
+        data = json.loads(data)
+    logging.debug(json.dumps(data, indent=2, ensure_ascii=False))
@@ -0,0 +1,147 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import Callable, Iterator, Optional
+
+
+class Priority(IntEnum):
+    HIGH = 0  # Invite・起動先の探索
+    NORMAL = 1  # 定期的な取得
+
+
+# 呼び出し元の優先度 (fetch_allのワーカースレッドにも引き継がれる)
+current_priority: ContextVar[Priority] = ContextVar(
+    "current_priority", default=Priority.NORMAL
+)
+
+
+@contextmanager
+def priority(p: Priority) -> Iterator[None]:
+    token = current_priority.set(p)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+@dataclass
+class TokenBucket:
+    rate: float  # 1秒あたりの補充数
+    capacity: float
+    tokens: float
+    updated_at: float
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    # Retry-After は秒数またはHTTP日付
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RateLimiter:
+    # family -> (1秒あたりのリクエスト数, バースト数)
+    DEFAULT_BUDGETS: dict[str, tuple[float, float]] = {
+        "auth": (0.2, 2),
+        "users": (0.5, 3),
+        "groups": (0.5, 3),
+        "instances": (2.0, 5),
+        "worlds": (0.5, 2),
+        "invite": (0.2, 2),
+    }
+    FALLBACK_BUDGET: tuple[float, float] = (0.5, 2)
+
+    def __init__(
+        self,
+        budgets: Optional[dict[str, tuple[float, float]]] = None,
+        reserve: float = 1,
+        default_cooldown: float = 60,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.budgets = {**self.DEFAULT_BUDGETS, **(budgets or {})}
+        self.reserve = reserve  # 優先度の高いリクエスト用に残しておくトークン数
+        self.default_cooldown = default_cooldown
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._buckets: dict[str, TokenBucket] = {}
+        self._waiting: dict[Priority, int] = {p: 0 for p in Priority}
+        self._cooldown_until = 0.0
+
+    def _bucket(self, family: str, now: float) -> TokenBucket:
+        if family not in self._buckets:
+            rate, capacity = self.budgets.get(family, self.FALLBACK_BUDGET)
+            self._buckets[family] = TokenBucket(rate, capacity, capacity, now)
+        bucket = self._buckets[family]
+        bucket.refill(now)
+        return bucket
+
+    def _try_take(self, family: str, priority: Priority, now: float) -> float:
+        # 取得できた場合は0、できない場合は次に試すまでの秒数を返す
+        if now < self._cooldown_until:
+            return self._cooldown_until - now
+
+        if any(self._waiting[p] > 0 for p in Priority if p < priority):
+            return 0.1
+
+        bucket = self._bucket(family, now)
+        need = 1 + (self.reserve if priority > Priority.HIGH else 0)
+        if bucket.tokens >= need:
+            bucket.tokens -= 1
+            return 0.0
+        return (need - bucket.tokens) / bucket.rate
+
+    def acquire(
+        self,
+        family: str,
+        priority: Optional[Priority] = None,
+        timeout: Optional[float] = None,
+    ) -> bool:
+        priority = current_priority.get() if priority is None else priority
+        deadline = None if timeout is None else self._clock() + timeout
+
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    now = self._clock()
+                    wait = self._try_take(family, priority, now)
+                    if wait <= 0:
+                        return True
+                    if deadline is not None:
+                        if now + wait > deadline:
+                            return False
+                    self._cond.wait(wait)
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+
+    def cooldown(self, seconds: Optional[float]) -> float:
+        # 429を受けた場合は全ファミリーのリクエストを一定時間止める
+        seconds = self.default_cooldown if seconds is None else seconds
+        with self._cond:
+            self._cooldown_until = max(self._cooldown_until, self._clock() + seconds)
+            self._cond.notify_all()
+        logging.warning(f"⚠️ Rate limited by server, cooling down for {seconds:.0f}s")
+        return seconds
+
+    def cooldown_remaining(self) -> float:
+        return max(0.0, self._cooldown_until - self._clock())
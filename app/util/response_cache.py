@@ -0,0 +1,149 @@
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, TypeVar
+from urllib.parse import urlencode
+
+from app.config import Config
+from app.util.fs import write_json_atomic
+from app.util.metrics import Counters
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    ttl: float  # この秒数までは新鮮とみなしそのまま返す
+    stale: float = 0  # ttl経過後この秒数までは古い値を返しつつ裏で再取得する
+
+
+@dataclass
+class _Entry:
+    data: Any  # JSON応答 (ディスク保存用)
+    stored_at: float  # time.time()
+    value: Any = None  # パース済みの値 (ディスクから読み込んだ直後はNone)
+
+
+def cache_key(url: str, params: Optional[dict] = None) -> str:
+    if not params:
+        return url
+    return f"{url}?{urlencode(sorted(params.items()))}"
+
+
+class ResponseCache:
+    # 変化の少ないGET応答をTTL付きで保持する (件数上限を超えたら古い順に破棄)
+    def __init__(
+        self,
+        max_entries: int = 256,
+        path: Optional[Path] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_entries = max_entries
+        self.path = path
+        self.clock = clock
+        self.stats = Counters()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._refreshing: set[str] = set()
+        self._load()
+
+    @classmethod
+    def from_config(cls, config: Config) -> "ResponseCache":
+        return cls(
+            max_entries=config.cache_max_entries, path=config.response_cache_file
+        )
+
+    def get(
+        self, key: str, policy: CachePolicy, parse: Callable[[Any], T]
+    ) -> Optional[tuple[T, bool]]:
+        # (値, 再取得が必要か) を返す。期限切れ・未取得の場合はNone
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.inc("misses")
+                return None
+
+            age = self.clock() - entry.stored_at
+            if age > policy.ttl + policy.stale:
+                self.stats.inc("expired")
+                return None
+
+            self._entries.move_to_end(key)
+            if entry.value is None:
+                try:
+                    entry.value = parse(entry.data)
+                except Exception as e:
+                    # 保存時から応答の形式が変わった場合などは取得し直す
+                    logging.debug(f"Discarding cached response {key}: {e}")
+                    del self._entries[key]
+                    self.stats.inc("misses")
+                    return None
+
+            stale = age > policy.ttl
+            self.stats.inc("stale" if stale else "hits")
+            return entry.value, stale
+
+    def put(self, key: str, data: Any, value: Any) -> None:
+        with self._save_lock:
+            with self._lock:
+                self._entries[key] = _Entry(
+                    data=data, stored_at=self.clock(), value=value
+                )
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                snapshot = {
+                    k: {"data": e.data, "stored_at": e.stored_at}
+                    for k, e in self._entries.items()
+                }
+            self._save(snapshot)
+
+    def begin_refresh(self, key: str) -> bool:
+        # 同じキーの裏での再取得は1つだけ走らせる
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key: str) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def clear(self) -> None:
+        with self._save_lock:
+            with self._lock:
+                self._entries.clear()
+            self._save({})
+
+    def _load(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            for key, e in saved.items():
+                self._entries[key] = _Entry(data=e["data"], stored_at=e["stored_at"])
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logging.warning(f"⚠️ Failed to load response cache {self.path}: {e}")
+            self._entries.clear()
+            return
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        logging.debug(f"Loaded {len(self._entries)} cached responses from {self.path}")
+
+    def _save(self, snapshot: dict) -> None:
+        if self.path is None:
+            return
+
+        try:
+            write_json_atomic(self.path, snapshot)
+        except OSError as e:
+            logging.warning(f"⚠️ Failed to save response cache {self.path}: {e}")
@@ -0,0 +1,94 @@
+import time
+import logging
+import argparse
+from pathlib import Path
+
+from app.autoscaler import AutoscalePolicy, InstanceAutoscaler
+from app.const.group import DEKAPU_WORLD_ID, GROUPNAME_MAP, INSTANCE_NAME_LIST
+from app.instance_manager import InstanceManager
+from app.service.vrc_service import VRCService
+from app.util.logger import setup_logger
+
+setup_logger()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="グループインスタンスの空き枠に応じて自動で作成・クローズする"
+    )
+    parser.add_argument("--group", choices=list(GROUPNAME_MAP), required=True)
+    parser.add_argument("--interval", type=float, default=60, help="監視間隔[秒]")
+    parser.add_argument(
+        "--min-headroom",
+        type=int,
+        default=10,
+        help="空き枠の合計がこれを下回ったら作成",
+    )
+    parser.add_argument(
+        "--grace", type=float, default=900, help="無人のままクローズするまでの秒数"
+    )
+    parser.add_argument("--min-instances", type=int, default=1)
+    parser.add_argument("--max-instances", type=int, default=len(INSTANCE_NAME_LIST))
+    parser.add_argument(
+        "--action-interval",
+        type=float,
+        default=300,
+        help="作成・クローズの最小間隔[秒]",
+    )
+    parser.add_argument(
+        "--role", action="append", dest="role_ids", help="作成時に指定するロールID"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="作成・クローズせずにログのみ出す"
+    )
+    parser.add_argument(
+        "--state-file",
+        type=Path,
+        help="作成したインスタンスIDの保存先 (デフォルト: data/autoscaler_<グループID>.json)",
+    )
+    args = parser.parse_args()
+
+    group_id = GROUPNAME_MAP[args.group]
+    service = VRCService()
+    instances = InstanceManager(
+        vrc_api=service.api,
+        world_id=DEKAPU_WORLD_ID,
+        group_id=group_id,
+        max_workers=service.cfg.fetch_workers,
+        # 人数・待機列で作成・クローズを判断するので監視間隔より古い詳細は使わない
+        max_age=min(service.cfg.instance_max_age, args.interval),
+    )
+    autoscaler = InstanceAutoscaler(
+        service,
+        instances,
+        AutoscalePolicy(
+            min_headroom=args.min_headroom,
+            grace=args.grace,
+            min_instances=args.min_instances,
+            max_instances=args.max_instances,
+            action_interval=args.action_interval,
+        ),
+        role_ids=args.role_ids,
+        dry_run=args.dry_run,
+        state_file=args.state_file or Path("data") / f"autoscaler_{group_id}.json",
+    )
+
+    logging.info(
+        f"🤖 Autoscaler started for {args.group}"
+        + (" (dry-run)" if args.dry_run else "")
+    )
+    try:
+        while True:
+            try:
+                autoscaler.step()
+            except Exception as e:
+                logging.exception(e)
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.save_session()
+
+
+if __name__ == "__main__":
+    main()
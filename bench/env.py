@@ -0,0 +1,15 @@
+import os
+
+from bench import payloads
+
+
+def setup(base_url: str) -> None:
+    # ベンチマーク用の設定 (.envより優先)
+    os.environ.update(
+        ID="bench",
+        PASSWORD="bench",
+        TOTP_SECRET="JBSWY3DPEHPK3PXP",
+        USER_ID=payloads.USER_ID,
+        PROFILE="0",
+        VRCHAT_API_URL=base_url,
+    )
@@ -0,0 +1,281 @@
+import sqlite3
+import logging
+import argparse
+import statistics
+from pathlib import Path
+from itertools import groupby
+from datetime import datetime, timezone
+from dataclasses import dataclass, field
+from typing import Optional
+
+from app.config import Config
+from app.instance_scoring import InstanceScorer
+from app.invite_controller import InviteController
+from app.model.snapshot import InstanceIndex, InstanceSnapshot, WorldRef
+from app.model.instance_type import InstanceType
+from app.population_forecast import Observation, PopulationForecaster
+
+
+class ReplayClock:
+    # 記録された時刻を現在時刻として返す
+    def __init__(self) -> None:
+        self.ts = 0.0
+
+    def __call__(self) -> float:
+        return self.ts
+
+
+class ReplayAPI:
+    # Inviteは送らず、移動の再現はPolicy側で行う
+    def invite_myself(self, target: InstanceSnapshot) -> None:
+        pass
+
+
+@dataclass
+class Policy:
+    # 記録済みの人数で、Inviteに応じて移動するユーザーを再現する
+    name: str
+    invites: InviteController
+    forecaster: Optional[PopulationForecaster] = None
+    location: Optional[str] = None
+    arrived_at: float = 0
+    moving: Optional[tuple[str, float]] = None  # (移動先, 到着時刻)
+    blocked: int = 0  # 到着時点で満員・クローズ済みで入れなかった回数
+    top_ticks: int = 0
+    reached: Optional[float] = None  # 現在の最大インスタンスに到着した時刻
+    lags: list[float] = field(default_factory=list)
+    missed: int = 0
+
+    def settle(self, changed_at: float) -> None:
+        if self.reached is None:
+            self.missed += 1
+        else:
+            self.lags.append(self.reached - changed_at)
+
+
+def load(db: Path, days: float, capacity: int) -> list[tuple[int, InstanceIndex]]:
+    conn = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+    try:
+        end = conn.execute("SELECT MAX(ts) FROM samples").fetchone()[0]
+        if end is None:
+            return []
+        rows = conn.execute(
+            "SELECT s.ts, i.instance_id, i.world_id, s.users, s.queue, s.closed, "
+            "s.capacity, s.closes_at FROM samples s "
+            "JOIN instances i ON i.id = s.instance WHERE s.ts >= ? ORDER BY s.ts",
+            (end - days * 86400,),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    worlds: dict[tuple[str, int], WorldRef] = {}
+
+    def snapshot(ts, iid, world_id, users, queue, closed, cap, closes_at):
+        # 定員・クローズ時刻の列がない頃の履歴は --capacity と記録時刻で補う
+        cap = capacity if cap is None else cap
+        if closes_at is None and closed:
+            closes_at = ts
+        world = worlds.get((world_id, cap))
+        if world is None:
+            world = worlds[(world_id, cap)] = WorldRef(
+                {"id": world_id, "name": world_id, "capacity": cap}
+            )
+        return InstanceSnapshot(
+            id=f"{world_id}:{iid}",
+            display_name=None,
+            name=iid.split("~")[0],
+            location=f"{world_id}:{iid}",
+            type=InstanceType.GROUP,
+            group_access_type=None,
+            instance_id=iid,
+            short_name="",
+            user_count=users,
+            queue_enabled=queue > 0,
+            queue_size=queue,
+            region="jp",
+            tags=(),
+            closed_at=(
+                datetime.fromtimestamp(closes_at, timezone.utc) if closes_at else None
+            ),
+            world=world,
+            owner_id=None,
+        )
+
+    return [
+        (
+            ts,
+            InstanceIndex(
+                (snapshot(*r) for r in g),
+                now=datetime.fromtimestamp(ts, timezone.utc),
+            ),
+        )
+        for ts, g in groupby(rows, key=lambda r: r[0])
+    ]
+
+
+def observations(index: InstanceIndex) -> list[Observation]:
+    return [
+        Observation(
+            i.instance_id,
+            i.user_count,
+            i.queue_size if i.queue_enabled else 0,
+            i.closed_at.timestamp() if i.closed_at else None,
+            i.world.capacity,
+        )
+        for i in index
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="人数の履歴で、予測による先回りInviteと従来の判定を比較"
+    )
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=Config.history_db_path(),
+        help="履歴の保存先 (デフォルト: HISTORY_DB)",
+    )
+    parser.add_argument("--days", type=float, default=7, help="対象とする直近の日数")
+    parser.add_argument(
+        "--threshold", type=float, default=8, help="従来の判定のスコア差"
+    )
+    parser.add_argument(
+        "--capacity",
+        type=int,
+        default=80,
+        help="定員が記録されていない履歴で使う定員",
+    )
+    parser.add_argument(
+        "--travel", type=float, default=60, help="Inviteから到着までの秒数"
+    )
+    parser.add_argument("--horizon", type=float, default=300)
+    parser.add_argument("--window", type=float, default=600)
+    parser.add_argument("--margin", type=float, default=3)
+    parser.add_argument("--queue-weight", type=float, default=0.5)
+    parser.add_argument("--cooldown", type=float, default=300)
+    parser.add_argument("--switch-margin", type=int, default=3)
+    parser.add_argument("--arrival-timeout", type=float, default=600)
+    parser.add_argument(
+        "--min-lead", type=float, default=300, help="集計対象とする最大の継続秒数"
+    )
+    args = parser.parse_args()
+    # Inviteの送信・未到着のログは集計結果のみ出す
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.db is None:
+        raise SystemExit("HISTORY_DB が空のため履歴は保存されていません (--db で指定)")
+    ticks = load(args.db, args.days, args.capacity)
+    if not ticks:
+        raise SystemExit(f"{args.db} に履歴がありません")
+
+    clock = ReplayClock()
+    scorer = InstanceScorer(clock=clock)
+    forecaster = PopulationForecaster(
+        horizon=args.horizon,
+        window=args.window,
+        queue_weight=args.queue_weight,
+        margin=args.margin,
+        clock=clock,
+    )
+
+    def controller() -> InviteController:
+        # botと同じ再送間隔・切り替えの条件でInviteを間引く
+        return InviteController(
+            ReplayAPI(),
+            cooldown=args.cooldown,
+            switch_margin=args.switch_margin,
+            arrival_timeout=args.arrival_timeout,
+            clock=clock,
+        )
+
+    policies = [
+        Policy("reactive", controller()),
+        Policy("forecast", controller(), forecaster),
+    ]
+
+    leader: Optional[str] = None
+    changed_at = 0.0
+    changes = 0
+    for ts, index in ticks:
+        clock.ts = ts
+        forecaster.observe(ts, observations(index))
+        top = index.most_populated
+        if top is None:
+            continue
+
+        # 最大インスタンスが入れ替わったら、入れ替わりから到着までの時間を集計
+        # (開始直後・短時間で入れ替わった場合は対象外)
+        if top.location != leader:
+            if leader is not None and ts - changed_at >= args.min_lead and changes:
+                for p in policies:
+                    p.settle(changed_at)
+            changes += leader is not None
+            leader, changed_at = top.location, ts
+            for p in policies:
+                p.reached = None
+
+        for p in policies:
+            if p.moving is not None and p.moving[1] <= ts:
+                # 到着時点で満員・クローズ済みなら入れずに元のインスタンスに残る
+                dest = index.by_location(p.moving[0])
+                if dest is not None and index.is_joinable(dest):
+                    p.location, p.arrived_at = p.moving[0], p.moving[1]
+                    p.invites.observe(p.location)
+                else:
+                    p.blocked += 1
+                p.moving = None
+            if p.location is None:
+                # 開始時点では最大インスタンスにいるものとする
+                p.location, p.arrived_at = top.location, ts
+
+            if p.location == leader and p.reached is None:
+                p.reached = p.arrived_at
+
+            here = index.by_location(p.location)
+            if here is not None and here.user_count >= top.user_count:
+                p.top_ticks += 1
+            if p.moving is not None:
+                continue
+
+            # botと同じく、現在地は人数のみ・移動先は待機列・クローズも含めたスコアで比べる
+            target: Optional[InstanceSnapshot] = None
+            candidates = [i for i in index.by_population if i is not here]
+            if candidates and (
+                here is None
+                or max(scorer.score_instances(candidates)) - scorer.score_resident(here)
+                >= args.threshold
+            ):
+                target = scorer.best(candidates)
+            elif p.forecaster is not None:
+                target = p.forecaster.early_invite(index, p.location)
+
+            if target is not None and p.invites.invite(target, index):
+                p.moving = (target.location, ts + args.travel)
+
+    hours = (ticks[-1][0] - ticks[0][0]) / 3600
+    counted = len(policies[0].lags) + policies[0].missed
+    print(
+        f"{len(ticks)} ticks over {hours:.1f}h, "
+        f"{changes} leader changes ({counted} lasting >= {args.min_lead:.0f}s)"
+    )
+    for p in policies:
+        lag = statistics.mean(p.lags) / 60 if p.lags else float("nan")
+        stats = p.invites.stats.snapshot()
+        suppressed = sum(v for k, v in stats.items() if k.startswith("suppressed_"))
+        print(
+            f"{p.name:<9} in top {p.top_ticks / len(ticks) * 100:5.1f}%  "
+            f"invites={stats.get('sent', 0):4d}  suppressed={suppressed:4d}  "
+            f"blocked={p.blocked:4d}  reached={len(p.lags):4d}  missed={p.missed:4d}  "
+            f"mean lag={lag:+6.1f}min"
+        )
+
+    # 到着が入れ替わりより前(負の値)なら先回りできている
+    reactive, forecast = policies
+    if reactive.lags and forecast.lags:
+        earlier = (statistics.mean(reactive.lags) - statistics.mean(forecast.lags)) / 60
+        print(f"forecast reaches the new top instance {earlier:+.1f} min earlier")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import re
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from bench import payloads
+
+
+class MockState:
+    def __init__(self, n_instances: int, latency: float, rate_limit_every: int, retry_after: int):
+        self.instances = {i["instanceId"]: i for i in payloads.instances(n_instances)}
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self.logins = 0
+
+
+def make_handler(state: MockState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body, headers: Optional[dict] = None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _handle(self, method: str):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                self.rfile.read(length)
+
+            with state.lock:
+                state.requests += 1
+                limited = state.rate_limit_every > 0 and state.requests % state.rate_limit_every == 0
+                if limited:
+                    state.rate_limited += 1
+
+            if state.latency:
+                time.sleep(state.latency)
+
+            if limited:
+                return self._send(
+                    429, {"error": {"message": "Too Many Requests", "status_code": 429}},
+                    {"Retry-After": str(state.retry_after)},
+                )
+
+            path = self.path.split("?")[0]
+            first = next(iter(state.instances.values()), None)
+
+            if path.endswith("/auth/user"):
+                if self.headers.get("Authorization"):
+                    with state.lock:
+                        state.logins += 1
+                        n = state.logins
+                    return self._send(
+                        200, {"requiresTwoFactorAuth": ["totp", "otp"]},
+                        {"Set-Cookie": f"auth=authcookie_mock_{n}; Path=/"},
+                    )
+                if "auth=" not in (self.headers.get("Cookie") or ""):
+                    return self._send(401, {"error": {"message": "Missing Credentials"}})
+                return self._send(200, payloads.user(first["location"] if first else ""))
+            if path.endswith("/auth/twofactorauth/totp/verify"):
+                return self._send(200, {"verified": True})
+            if m := re.search(r"/users/([^/]+)$", path):
+                return self._send(200, payloads.user(first["location"] if first else ""))
+            if re.search(r"/groups/[^/]+/instances$", path):
+                return self._send(200, [payloads.group_instance(i) for i in state.instances.values()])
+            if re.search(r"/groups/[^/]+/posts$", path):
+                return self._send(200, {"posts": [payloads.post()]})
+            if re.search(r"/groups/[^/]+/roles$", path):
+                return self._send(200, [])
+            if m := re.search(r"/instances/([^/:]+):([^/]+)$", path):
+                inst = state.instances.get(m.group(2))
+                if inst is None:
+                    return self._send(404, {"error": {"message": "Instance not found"}})
+                return self._send(200, inst)
+            if m := re.search(r"/worlds/([^/]+)$", path):
+                body = payloads.world(m.group(1))
+                body.update(
+                    occupants=0,
+                    privateOccupants=0,
+                    publicOccupants=0,
+                    instances=[[i["instanceId"], i["userCount"]] for i in state.instances.values()],
+                )
+                return self._send(200, body)
+            if re.search(r"/invite/myself/to/", path) and method == "POST":
+                return self._send(200, {})
+            return self._send(404, {"error": {"message": f"{method} {path} not found"}})
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def do_DELETE(self):
+            self._handle("DELETE")
+
+    return Handler
+
+
+def serve(
+    port: int = 0,
+    n_instances: int = 20,
+    latency: float = 0.0,
+    rate_limit_every: int = 0,
+    retry_after: int = 1,
+) -> tuple[ThreadingHTTPServer, MockState]:
+    # port=0 の場合は空いているポートを使う (server.server_address[1] で取得)
+    state = MockState(n_instances, latency, rate_limit_every, retry_after)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VRChat API の簡易モックサーバー")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--instances", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="レスポンス遅延[秒]")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="N回に1回429を返す")
+    parser.add_argument("--retry-after", type=int, default=1)
+    args = parser.parse_args()
+
+    server, _ = serve(args.port, args.instances, args.latency, args.rate_limit_every, args.retry_after)
+    print(f"Mock VRChat API: http://127.0.0.1:{server.server_address[1]}/api/1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
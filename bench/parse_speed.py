@@ -0,0 +1,90 @@
+import json
+import time
+import logging
+import argparse
+from typing import Callable
+
+from bench import payloads
+from app.util.logger import debug_json
+from app.model.vrchat import GroupInstance, InstanceInfo, UserInfo
+from app.model.snapshot import GroupInstanceSnapshot, InstanceSnapshot
+
+
+def measure(fn: Callable[[], object], rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return min(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="ホットなエンドポイントの応答パース時間を従来の方法と比較"
+    )
+    parser.add_argument("--instances", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    # DEBUGログ無効 (通常運用) の状態で比較する
+    logging.basicConfig(level=logging.INFO)
+
+    instances = payloads.instances(args.instances)
+    user = json.dumps(payloads.user(instances[0]["location"])).encode()
+    instance = json.dumps(instances[0]).encode()
+    group = json.dumps([payloads.group_instance(i) for i in instances]).encode()
+
+    def legacy(raw: bytes, parse: Callable[[object], object]) -> Callable[[], object]:
+        # 以前の処理: dict化 → 常にダンプ文字列を生成 → 全項目をバリデーション
+        def run():
+            data = json.loads(raw)
+            logging.debug(json.dumps(data, indent=2, ensure_ascii=False))
+            return parse(data)
+
+        return run
+
+    def current(raw: bytes, parse: Callable[[object], object]) -> Callable[[], object]:
+        def run():
+            data = json.loads(raw)
+            debug_json(data)
+            return parse(data)
+
+        return run
+
+    def from_bytes(raw: bytes, parse: Callable[[bytes], object]) -> Callable[[], object]:
+        def run():
+            debug_json(raw)
+            return parse(raw)
+
+        return run
+
+    cases = (
+        (
+            "user",
+            legacy(user, lambda d: UserInfo(**d)),
+            from_bytes(user, UserInfo.model_validate_json),
+        ),
+        (
+            "instance",
+            legacy(instance, lambda d: InstanceInfo(**d)),
+            current(instance, InstanceSnapshot.from_json),
+        ),
+        (
+            f"group x{args.instances}",
+            legacy(group, lambda d: [GroupInstance(**gi) for gi in d]),
+            current(group, lambda d: [GroupInstanceSnapshot.from_json(gi) for gi in d]),
+        ),
+    )
+
+    for name, before, after in cases:
+        b = measure(before, args.rounds)
+        a = measure(after, args.rounds)
+        print(
+            f"{name:<12} before={b * 1e6:9.1f}us after={a * 1e6:9.1f}us "
+            f"speedup={b / a:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
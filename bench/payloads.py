@@ -0,0 +1,106 @@
+import random
+
+WORLD_ID = "wrld_1af53798-92a3-4c3f-99ae-a7c42ec6084d"
+GROUP_ID = "grp_5900a25d-0bb9-48d4-bab1-f3bd5c9a5e73"
+USER_ID = "usr_00000000-0000-0000-0000-000000000000"
+
+
+def world(world_id: str = WORLD_ID, capacity: int = 80) -> dict:
+    return {
+        "id": world_id,
+        "name": "クソでっけぇプッシャーゲーム",
+        "description": "x" * 400,
+        "authorId": "usr_11111111-1111-1111-1111-111111111111",
+        "authorName": "author",
+        "capacity": capacity,
+        "recommendedCapacity": capacity // 2,
+        "tags": [f"author_tag_{i}" for i in range(10)],
+        "created_at": "2024-01-01T00:00:00.000Z",
+        "updated_at": "2025-01-01T00:00:00.000Z",
+        "labsPublicationDate": "2024-01-02T00:00:00.000Z",
+        "publicationDate": "2024-01-03T00:00:00.000Z",
+        "thumbnailImageUrl": "https://example.com/thumbnail.png",
+        "releaseStatus": "public",
+        "organization": "vrchat",
+        "version": 42,
+        "visits": 1234567,
+        "popularity": 10,
+        "favorites": 12345,
+        "heat": 5,
+    }
+
+
+def instance(
+    no: int,
+    user_count: int,
+    world_id: str = WORLD_ID,
+    group_id: str = GROUP_ID,
+    closed: bool = False,
+) -> dict:
+    instance_id = f"{no:05d}~group({group_id})~groupAccessType(public)~region(jp)"
+    return {
+        "id": f"{world_id}:{instance_id}",
+        "displayName": None,
+        "name": f"{no:05d}",
+        "location": f"{world_id}:{instance_id}",
+        "type": "group",
+        "groupAccessType": "public",
+        "instanceId": instance_id,
+        "secureName": f"short{no}",
+        "userCount": user_count,
+        "queueEnabled": True,
+        "queueSize": max(0, user_count - 78),
+        "region": "jp",
+        "tags": ["language_jpn"],
+        "closedAt": "2025-01-01T00:00:00.000Z" if closed else None,
+        "world": world(world_id),
+        "worldId": world_id,
+        "ownerId": group_id,
+    }
+
+
+def group_instance(inst: dict) -> dict:
+    return {
+        "instanceId": inst["instanceId"],
+        "location": inst["location"],
+        "memberCount": inst["userCount"],
+        "world": inst["world"],
+    }
+
+
+def user(location: str) -> dict:
+    world_id, _, instance_id = location.partition(":")
+    return {
+        "id": USER_ID,
+        "username": "bench",
+        "displayName": "bench",
+        "state": "online",
+        "worldId": world_id,
+        "instanceId": instance_id,
+        "location": location,
+        "travelingToInstance": "",
+        "travelingToLocation": "",
+        "travelingToWorld": "",
+    }
+
+
+def post() -> dict:
+    return {
+        "id": "gpost_00000000-0000-0000-0000-000000000000",
+        "groupId": GROUP_ID,
+        "authorId": USER_ID,
+        "editorId": None,
+        "visibility": "public",
+        "roleIds": [],
+        "title": "title",
+        "text": "text",
+        "imageId": None,
+        "imageUrl": None,
+        "createdAt": "2025-01-01T00:00:00.000Z",
+        "updatedAt": "2025-01-01T00:00:00.000Z",
+    }
+
+
+def instances(n: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    return [instance(i + 1, rng.randint(0, 80), closed=rng.random() < 0.1) for i in range(n)]
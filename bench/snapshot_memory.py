@@ -0,0 +1,72 @@
+import gc
+import json
+import time
+import argparse
+import tracemalloc
+from typing import Callable
+
+from bench import payloads
+from app.model.vrchat import GroupInstance, InstanceInfo
+from app.model.snapshot import GroupInstanceSnapshot, InstanceSnapshot
+
+
+def retained(parse: Callable[[dict], object], raw: bytes) -> tuple[int, list]:
+    # 応答のJSONを破棄した後も残るメモリ量を計測する
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    values = [parse(d) for d in json.loads(raw)]
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return size, values
+
+
+def parse_time(parse: Callable[[dict], object], raw: bytes, rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        data = json.loads(raw)
+        started = time.perf_counter()
+        for d in data:
+            parse(d)
+        samples.append(time.perf_counter() - started)
+    return min(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="pydanticモデルと軽量スナップショットのメモリ使用量・パース時間を比較"
+    )
+    parser.add_argument("--instances", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    instances = payloads.instances(args.instances)
+    cases = (
+        (
+            "instance",
+            json.dumps(instances).encode(),
+            InstanceInfo.model_validate,
+            InstanceSnapshot.from_json,
+        ),
+        (
+            "group instance",
+            json.dumps([payloads.group_instance(i) for i in instances]).encode(),
+            GroupInstance.model_validate,
+            GroupInstanceSnapshot.from_json,
+        ),
+    )
+
+    print(f"{args.instances} instances")
+    for name, raw, model, snapshot in cases:
+        for kind, parse in (("pydantic", model), ("snapshot", snapshot)):
+            size, _ = retained(parse, raw)
+            elapsed = parse_time(parse, raw, args.rounds)
+            print(
+                f"{name:<15} {kind:<9} retained={size / 1024:8.1f}KiB "
+                f"parse={elapsed * 1000:7.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
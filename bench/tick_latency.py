@@ -0,0 +1,87 @@
+import time
+import asyncio
+import argparse
+import statistics
+
+from bench import env
+from bench.mock_api import serve
+
+
+def report(name: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(
+        f"{name:<16} mean={statistics.mean(samples) * 1000:8.1f}ms "
+        f"p95={p95 * 1000:8.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同期/非同期クライアントの1tickあたりの所要時間を比較")
+    parser.add_argument("--instances", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="モックAPIの応答遅延[秒]")
+    parser.add_argument("--ticks", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    server, _ = serve(n_instances=args.instances, latency=args.latency)
+    env.setup(f"http://127.0.0.1:{server.server_address[1]}/api/1")
+
+    from app.config import Config
+    from app.util.http import HttpClient
+    from app.util.async_http import AsyncHttpClient
+    from app.util.auth import AuthManager
+    from app.api.vrchat_api import VRChatAPI
+    from app.api.async_vrchat_api import AsyncVRChatAPI
+    from app.instance_manager import InstanceManager
+    from app.post_manager import PostManager
+
+    cfg = Config()
+    http = HttpClient()
+    auth = AuthManager(http, cfg)
+    vrc_api = VRChatAPI(http, auth, cfg)
+    if not auth.ensure_logged_in():
+        raise SystemExit("login to mock API failed")
+
+    def manager(workers: int) -> tuple[InstanceManager, PostManager]:
+        # max_age=0 で毎回すべての詳細を取得する
+        im = InstanceManager(
+            vrc_api, Config.DEKAPU_WORLD_ID, Config.DEKAPU_GROUP_ID, workers, max_age=0
+        )
+        return im, PostManager(vrc_api, Config.DEKAPU_GROUP_ID)
+
+    def sync_tick(im: InstanceManager, pm: PostManager) -> None:
+        vrc_api.get_user_info(cfg.user_id)
+        im.update()
+        pm.check_new_post()
+
+    for name, workers in (("sync sequential", 1), ("sync threaded", args.workers)):
+        im, pm = manager(workers)
+        samples = []
+        for _ in range(args.ticks):
+            started = time.perf_counter()
+            sync_tick(im, pm)
+            samples.append(time.perf_counter() - started)
+        report(name, samples)
+
+    async def run_async() -> list[float]:
+        async_api = AsyncVRChatAPI(AsyncHttpClient(http), auth, cfg)
+        im, pm = manager(args.workers)
+        samples = []
+        for _ in range(args.ticks):
+            started = time.perf_counter()
+            await asyncio.gather(
+                async_api.get_user_info(cfg.user_id),
+                im.update_async(async_api),
+                pm.check_new_post_async(async_api),
+            )
+            samples.append(time.perf_counter() - started)
+        await async_api.http.aclose()
+        return samples
+
+    report("async", asyncio.run(run_async()))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
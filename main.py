@@ -1,20 +1,31 @@
 import sys
-import time
+import asyncio
 import logging
 from typing import Optional
 
 from app.populate_monitor import PopulationMonitor
+from app.instance_events import InstanceEventStream, log_event
+from app.instance_scoring import InstanceScorer, ScoreWeights
+from app.population_store import PopulationStore
+from app.population_forecast import PopulationForecaster
+from app.invite_controller import InviteController
 from app.post_manager import PostManager
 from app.instance_manager import InstanceManager
 from app.travelling_monitor import TravelingMonitor
 from app.connection_monitor import ConnectionMonitor
+from app.tick_scheduler import TickScheduler, TickState
+from app.task_scheduler import TaskScheduler
 from app.config import Config
 from app.util.http import HttpClient
+from app.util.async_http import AsyncHttpClient
+from app.util.rate_limit import Priority, RateLimiter, priority
 from app.util.auth import AuthManager
 from app.util.logger import setup_logger
 from app.util.launcher import LaunchOptions, VRCLauncher
-from app.model.vrchat import InstanceInfo, UserState
+from app.model.snapshot import InstanceSnapshot
+from app.model.vrchat import GroupPostInfo, UserInfo, UserState
 from app.api.vrchat_api import VRChatAPI
+from app.api.async_vrchat_api import AsyncVRChatAPI
 from app.api.patlite_api import (
     ControlOptions,
     LedOptions,
@@ -26,14 +37,14 @@ from app.api.patlite_api import (
 setup_logger()
 
 cfg = Config()
-http = HttpClient()
+http = HttpClient(rate_limiter=RateLimiter())
 auth = AuthManager(http, cfg)
 vrc_api = VRChatAPI(http, auth, cfg)
 pl_api = PatliteAPI(http, ip_address=cfg.patlite_ip)
 launcher = VRCLauncher(profile=cfg.profile)
 
 
-def launch_with_instance(instance: Optional[InstanceInfo]):
+def launch_with_instance(instance: Optional[InstanceSnapshot]):
     if instance:
         logging.info(f"Instance specified. Instance No: {instance.name}")
     else:
@@ -72,95 +83,320 @@ def launch_with_instance(instance: Optional[InstanceInfo]):
     )
 
 
+def notify_launch_given_up():
+    pl_api.control(
+        ControlOptions(
+            led=LedOptions(red=LightPattern.BLINK1),
+            speech="再起動できませんでした。手動で起動して下さい。",
+            repeat=255,
+            notify=NotifySound.ALARM_1,
+        )
+    )
+
+
+def decide_tick_state(
+    user_info: Optional[UserInfo],
+    connection_monitor: ConnectionMonitor,
+    waiting_for_operator: bool,
+) -> TickState:
+    # 再起動を諦めて手動対応待ちの場合のみゆっくり監視
+    if waiting_for_operator:
+        return TickState.SLOW
+    # 再起動に失敗した直後は通常間隔で再試行する
+    if not launcher.is_running:
+        return TickState.NORMAL
+
+    # 移動中・ロスコネ中は素早く状態を確認する
+    if user_info is not None and user_info.traveling_to_location is not None:
+        return TickState.FAST
+    if connection_monitor.lost_count > 0:
+        return TickState.FAST
+
+    return TickState.NORMAL
+
+
 def main():
+    # 参加・Invite先の選択と最大インスタンスの判定で同じスコアを使う
+    scorer = InstanceScorer(ScoreWeights.from_config(cfg))
     instance_manager = InstanceManager(
         vrc_api=vrc_api,
         group_id=Config.DEKAPU_GROUP_ID,
         world_id=Config.DEKAPU_WORLD_ID,
+        max_workers=cfg.fetch_workers,
+        max_age=cfg.instance_max_age,
+        hot_count=cfg.instance_hot_count,
+        public_scan_limit=cfg.public_scan_limit,
+        recommend_max_age=cfg.recommend_max_age,
+        events=InstanceEventStream(
+            population_threshold=cfg.population_event_threshold,
+            queue_threshold=cfg.queue_event_threshold,
+        ),
+        scorer=scorer,
     )
     traveling_checker = TravelingMonitor(pl_api)
-    population_monitor = PopulationMonitor(pl_api)
+    population_monitor = PopulationMonitor(
+        pl_api, threshold=cfg.population_threshold, scorer=scorer
+    )
+
+    # インスタンス一覧は変化のみログに出す (全件は一定間隔で表示)
+    instance_manager.events.subscribe(log_event)
+    instance_manager.events.subscribe(population_monitor.on_event)
+
+    # 同じ移動先への連続Inviteや、最大インスタンスの入れ替わりによる往復を防ぐ
+    invites = InviteController(
+        vrc_api,
+        cooldown=cfg.invite_cooldown,
+        switch_margin=cfg.invite_switch_margin,
+        arrival_timeout=cfg.invite_arrival_timeout,
+    )
+
+    # 人数の推移から数分後の最大インスタンスを予測して先回りでInviteする
+    forecaster: Optional[PopulationForecaster] = None
+    if cfg.forecast_horizon > 0:
+        forecaster = PopulationForecaster(
+            horizon=cfg.forecast_horizon,
+            window=cfg.forecast_window,
+            queue_weight=cfg.forecast_queue_weight,
+            margin=cfg.forecast_margin,
+        )
+        instance_manager.events.subscribe(forecaster.on_event)
+
+    # 人数の履歴を保存しておく (チューニング・GUIでの参照用)
+    history: Optional[PopulationStore] = None
+    if cfg.history_db is not None:
+        history = PopulationStore(
+            cfg.history_db,
+            retention=cfg.history_retention_days * 86400,
+            flush_interval=cfg.history_flush_interval,
+        )
+        instance_manager.events.subscribe(history.on_event)
     connection_monitor = ConnectionMonitor(pl_api)
     post_manager = PostManager(vrc_api=vrc_api, group_id=Config.DEKAPU_GROUP_ID)
+    scheduler = TickScheduler(
+        fast=cfg.tick_fast, normal=cfg.tick_normal, slow=cfg.tick_slow
+    )
+
+    # asyncモードでは取得処理を非同期クライアントで実行する
+    runner: Optional[asyncio.Runner] = None
+    async_api: Optional[AsyncVRChatAPI] = None
+    if cfg.tick_mode == "async":
+        runner = asyncio.Runner()
+        async_api = AsyncVRChatAPI(
+            AsyncHttpClient(http), auth, cfg, cache=vrc_api.cache
+        )
+
+    tasks = TaskScheduler(runner=runner)
+    relaunch: list[Optional[InstanceSnapshot]] = []
+
+    def notify_post(post: Optional[GroupPostInfo]) -> Optional[GroupPostInfo]:
+        # 直近のグループ投稿を確認
+        if post:
+            pl_api.control(
+                ControlOptions(
+                    led=LedOptions(blue=LightPattern.BLINK1),
+                    speech=f"新しい投稿があります。{post.title} {post.text}",
+                    repeat=255,
+                    notify=NotifySound.CHIME_2,
+                )
+            )
+        return post
+
+    def check_posts() -> Optional[GroupPostInfo]:
+        return notify_post(post_manager.check_new_post())
+
+    async def check_posts_async() -> Optional[GroupPostInfo]:
+        return notify_post(await post_manager.check_new_post_async(async_api))
+
+    def check_user() -> None:
+        user_info: UserInfo = tasks.result("user")
+
+        # ロスコネ対策
+        if connection_monitor.check(user_info):
+            # Note: パラレルワールドが発生してオンライン状態が壊れる場合があるので一旦コメントアウト
+
+            # オフライン状態が継続する場合は再起動
+            # instance = instance_manager.find_joinable()
+            # launch_with_instance(instance)
+            pass
+
+        # オンライン時: メイン処理
+        if user_info.state == UserState.ONLINE:
+            # 以降のチェックはグループインスタンス情報が必要
+            tasks.ensure_fresh("instances", cfg.instances_interval)
+            instance_manager.events.update_user(user_info.location)
+            invites.observe(user_info.location)
+
+            # 無限Joining対策 (再起動はtickの通信予算の外で行う)
+            if traveling_checker.check(user_info):
+                with priority(Priority.HIGH):
+                    relaunch.append(instance_manager.recommend())
+
+            # でかプに滞在しているかチェック
+            if instance_manager.is_in_world(user_info):
+                logging.info("✅ Current world check: OK")
+            else:
+                logging.error("❌️ Current world check: NG")
+                pl_api.control(
+                    ControlOptions(
+                        led=LedOptions(red=LightPattern.BLINK1),
+                        speech="ワールドをチェックしてください",
+                        repeat=255,
+                        notify=NotifySound.ALARM_1,
+                    )
+                )
+
+            # グルパブ内で最多インスタンスに滞在しているかチェック
+            if not population_monitor.evaluate(instance_manager.instances, user_info):
+                # Inviteなので最大人数インスタンスを検索
+                with priority(Priority.HIGH):
+                    if target := instance_manager.recommend(most_populate=True):
+                        invites.invite(target, instance_manager.instances)
+            elif forecaster is not None and (
+                target := forecaster.early_invite(
+                    instance_manager.instances, user_info.location
+                )
+            ):
+                with priority(Priority.HIGH):
+                    if invites.invite(target, instance_manager.instances):
+                        logging.info(
+                            f"📈 Predicted to become most populated: {target.name}"
+                        )
+
+    def print_instances() -> None:
+        user_info: Optional[UserInfo] = tasks.result("user")
+        if user_info is not None and user_info.state == UserState.ONLINE:
+            instance_manager.print(user_info.location)
+
+    # 変化の頻度に合わせてタスクごとに実行間隔を設定 (登録順に実行)
+    # グループインスタンス情報は必要とするチェックがある場合のみ取得する
+    if async_api is not None:
+        tasks.register(
+            "user",
+            lambda: async_api.get_user_info(cfg.user_id),
+            interval=cfg.user_interval,
+        )
+        tasks.register(
+            "instances",
+            lambda: instance_manager.update_async(async_api),
+            interval=cfg.instances_interval,
+            jitter=5,
+            lazy=True,
+        )
+        tasks.register(
+            "posts", check_posts_async, interval=cfg.posts_interval, jitter=30
+        )
+    else:
+        tasks.register(
+            "user",
+            lambda: vrc_api.get_user_info(cfg.user_id),
+            interval=cfg.user_interval,
+        )
+        tasks.register(
+            "instances",
+            instance_manager.update,
+            interval=cfg.instances_interval,
+            jitter=5,
+            lazy=True,
+        )
+        tasks.register("posts", check_posts, interval=cfg.posts_interval, jitter=30)
+    tasks.register(
+        "monitor",
+        check_user,
+        interval=cfg.user_interval,
+        depends_on={"user": cfg.user_interval},
+    )
+    tasks.register("table", print_instances, interval=cfg.table_log_interval)
 
     auth.load_session()
+    failed_launches = 0  # 連続で再起動に失敗した回数
 
     try:
+        scheduler.start()
         while True:
             try:
                 if not auth.ensure_logged_in():
                     logging.error("❌️ ログインに失敗しました")
                     sys.exit(-1)
 
-                instance_manager.update()
-                user_info = vrc_api.get_user_info(cfg.user_id)
-
-                # VRChat落ち対策
-                if not launcher.is_running:
+                # VRChat落ち対策 (前回のスナップショットの推奨先を使い即座に再起動)
+                # LAUNCH_MAX_ATTEMPTS回続けて失敗したら手動で起動されるのを待つ
+                if launcher.is_running:
+                    failed_launches = 0
+                elif failed_launches >= cfg.launch_max_attempts:
+                    if launcher.attach():
+                        logging.info("✅ VRChat was started manually")
+                        failed_launches = 0
+                    else:
+                        logging.warning("⚠️ Waiting for VRChat to be started manually")
+                else:
                     logging.error("❌️ VRChat is not running. Restarting...")
-                    instance = instance_manager.find()
+                    with priority(Priority.HIGH):
+                        tasks.ensure_fresh("instances", cfg.recommend_max_age)
+                        instance = instance_manager.recommend()
                     launch_with_instance(instance)
-
-                # ロスコネ対策
-                if connection_monitor.check(user_info):
-                    # Note: パラレルワールドが発生してオンライン状態が壊れる場合があるので一旦コメントアウト
-
-                    # オフライン状態が継続する場合は再起動
-                    # instance = instance_manager.find_joinable()
-                    # launch_with_instance(instance)
-                    pass
-
-                # オンライン時: メイン処理
-                if user_info.state == UserState.ONLINE:
-                    # 無限Joining対策
-                    if traveling_checker.check(user_info):
-                        instance = instance_manager.find()
-                        launch_with_instance(instance)
-
-                    # でかプに滞在しているかチェック
-                    if instance_manager.is_in_world(user_info):
-                        logging.info("✅ Current world check: OK")
-                    else:
-                        logging.error("❌️ Current world check: NG")
-                        pl_api.control(
-                            ControlOptions(
-                                led=LedOptions(red=LightPattern.BLINK1),
-                                speech="ワールドをチェックしてください",
-                                repeat=255,
-                                notify=NotifySound.ALARM_1,
+                    if not launcher.is_running:
+                        failed_launches += 1
+                        if failed_launches >= cfg.launch_max_attempts:
+                            logging.error(
+                                f"❌️ Failed to restart VRChat {failed_launches} times. "
+                                "Waiting for manual start."
                             )
-                        )
+                            notify_launch_given_up()
 
-                    # グルパブ内で最多インスタンスに滞在しているかチェック
-                    if not population_monitor.evaluate(
-                        instance_manager.instances, user_info
-                    ):
-                        # Inviteなので最大人数インスタンスを検索
-                        if target := instance_manager.find(most_populate=True):
-                            vrc_api.invite_myself(target)
-
-                # 直近のグループ投稿を確認
-                if post := post_manager.check_new_post():
-                    pl_api.control(
-                        ControlOptions(
-                            led=LedOptions(blue=LightPattern.BLINK1),
-                            speech=f"新しい投稿があります。{post.title} {post.text}",
-                            repeat=255,
-                            notify=NotifySound.CHIME_2,
-                        )
-                    )
+                # 以降の1tick内のリクエストはTICK_DEADLINE秒以内に終える
+                with http.deadline(cfg.tick_deadline):
+                    if cfg.tick_mode in ("parallel", "async"):
+                        # 独立した取得処理を先に並列実行しておく
+                        prefetch = [n for n in ("user", "posts") if tasks.is_due(n)]
+                        last_user: Optional[UserInfo] = tasks.result("user")
+                        if (
+                            last_user is not None
+                            and last_user.state == UserState.ONLINE
+                        ):
+                            age = tasks.age("instances")
+                            if age is None or age > cfg.instances_interval:
+                                prefetch.append("instances")
+
+                        if cfg.tick_mode == "async":
+                            tasks.run_concurrent(prefetch, timeout=cfg.tick_deadline)
+                        else:
+                            tasks.run_parallel(prefetch, timeout=cfg.tick_deadline)
 
-                # インスタンス一覧情報を表示
-                instance_manager.print(user_info.location)
+                    ran = tasks.run_due()
+                    if skipped := tasks.skipped():
+                        logging.info(f"⏭️ Skipped fetches: {', '.join(skipped)}")
+                    logging.debug(f"Tasks ran: {ran}, stats: {tasks.stats()}")
+                    logging.debug(f"HTTP stats: {http.stats.snapshot()}")
+                    logging.debug(f"Auth stats: {auth.stats.snapshot()}")
+                    logging.debug(f"Response cache: {vrc_api.cache.stats.snapshot()}")
+                    logging.debug(f"Coalesced GETs: {vrc_api.flight.stats.snapshot()}")
+                    logging.debug(f"Invites: {invites.stats.snapshot()}")
+
+                if relaunch:
+                    instance = relaunch[-1]
+                    relaunch.clear()
+                    launch_with_instance(instance)
 
             except Exception as e:
                 logging.exception(e)
 
-            time.sleep(60)
+            scheduler.wait(
+                decide_tick_state(
+                    tasks.result("user"),
+                    connection_monitor,
+                    waiting_for_operator=failed_launches >= cfg.launch_max_attempts,
+                )
+            )
 
     except KeyboardInterrupt:
         pass
     finally:
+        tasks.shutdown()
+        if history is not None:
+            history.close()
+        if runner is not None:
+            runner.run(async_api.http.aclose())
+            runner.close()
         auth.save_session()
 
 
@@ -0,0 +1,27 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from tests import payloads
+from app.model.snapshot import InstanceSnapshot
+
+
+def make_instance(
+    no: int,
+    users: int,
+    queue: int = 0,
+    queue_enabled: bool = True,
+    closes_at: Optional[float] = None,
+    capacity: int = 80,
+) -> InstanceSnapshot:
+    # ワールド情報はIDごとに共有されるので定員ごとに別のワールドにする
+    world_id = f"wrld_capacity_{capacity}"
+    data = payloads.instance(no, users, world_id=world_id)
+    data["world"] = payloads.world(world_id, capacity=capacity)
+    data["queueSize"] = queue
+    data["queueEnabled"] = queue_enabled
+    data["closedAt"] = (
+        datetime.fromtimestamp(closes_at, timezone.utc).isoformat()
+        if closes_at is not None
+        else None
+    )
+    return InstanceSnapshot.from_json(data)
@@ -0,0 +1,43 @@
+WORLD_ID = "wrld_1af53798-92a3-4c3f-99ae-a7c42ec6084d"
+GROUP_ID = "grp_5900a25d-0bb9-48d4-bab1-f3bd5c9a5e73"
+
+
+def world(world_id: str = WORLD_ID, capacity: int = 80) -> dict:
+    return {
+        "id": world_id,
+        "name": "クソでっけぇプッシャーゲーム",
+        "authorId": "usr_11111111-1111-1111-1111-111111111111",
+        "authorName": "author",
+        "capacity": capacity,
+        "recommendedCapacity": capacity // 2,
+        "tags": [],
+        "releaseStatus": "public",
+        "version": 42,
+    }
+
+
+def instance(
+    no: int,
+    user_count: int,
+    world_id: str = WORLD_ID,
+    group_id: str = GROUP_ID,
+) -> dict:
+    instance_id = f"{no:05d}~group({group_id})~groupAccessType(public)~region(jp)"
+    return {
+        "id": f"{world_id}:{instance_id}",
+        "name": f"{no:05d}",
+        "location": f"{world_id}:{instance_id}",
+        "type": "group",
+        "groupAccessType": "public",
+        "instanceId": instance_id,
+        "secureName": f"short{no}",
+        "userCount": user_count,
+        "queueEnabled": True,
+        "queueSize": 0,
+        "region": "jp",
+        "tags": ["language_jpn"],
+        "closedAt": None,
+        "world": world(world_id),
+        "worldId": world_id,
+        "ownerId": group_id,
+    }
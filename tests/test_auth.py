@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+
+from app.util import auth as auth_module
+from app.util.auth import AuthManager
+from app.util.http import HttpClient
+
+
+def make_auth(tmp_path) -> AuthManager:
+    config = SimpleNamespace(
+        cookie_file=tmp_path / "usr_test.json",
+        base_url="https://api.vrchat.cloud/api/1",
+        session_trust=300,
+    )
+    return AuthManager(HttpClient(), config)
+
+
+def test_save_failure_does_not_fail_request(tmp_path, monkeypatch, caplog):
+    auth = make_auth(tmp_path)
+    auth.session.cookies.set("auth", "token", domain="api.vrchat.cloud")
+
+    def locked(path, obj):
+        raise PermissionError(13, "The process cannot access the file", str(path))
+
+    monkeypatch.setattr(auth_module, "write_json_atomic", locked)
+    auth.mark_verified()
+
+    assert auth.is_recently_verified()
+    assert "Failed to save session" in caplog.text
+    assert not auth.cookie_file.exists()
+
+    # 次にCookieを確認したときに保存し直す
+    monkeypatch.undo()
+    auth.save_if_changed()
+    assert auth.cookie_file.exists()
@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+from app.autoscaler import AutoscalePolicy, CloseInstance, InstanceAutoscaler
+from app.model.snapshot import InstanceIndex
+from tests.factory import make_instance
+
+POLICY = AutoscalePolicy(min_headroom=10, grace=0, min_instances=1, action_interval=0)
+
+
+class FakeService:
+    def __init__(self, created) -> None:
+        self.created = created
+        self.closed = []
+
+    def create_instance(self, **kwargs):
+        return self.created
+
+    def close_instance(self, inst) -> None:
+        self.closed.append(inst)
+
+
+class FakeInstances:
+    group_id = "grp"
+
+    def __init__(self, instances) -> None:
+        self.instances = InstanceIndex(instances)
+
+    def update(self) -> None:
+        pass
+
+
+def autoscaler(instances, state_file, created=None, dry_run=False):
+    return InstanceAutoscaler(
+        FakeService(created),
+        FakeInstances(instances),
+        POLICY,
+        dry_run=dry_run,
+        state_file=state_file,
+        clock=lambda: 0.0,
+    )
+
+
+def test_does_not_close_instances_created_by_others(tmp_path):
+    # 管理者が同じ名前で作成したインスタンスも無人ならクローズ対象にしない
+    busy, manual = make_instance(1, 40), make_instance(2, 0)
+    scaler = autoscaler([busy, manual], tmp_path / "state.json")
+    assert scaler.step() == []
+
+
+def test_closes_own_instance_after_restart(tmp_path):
+    state_file = tmp_path / "state.json"
+    busy, own = make_instance(1, 40), make_instance(2, 0)
+
+    scaler = autoscaler([busy], state_file, created=own)
+    scaler._execute(scaler.plan(InstanceIndex([])).pop())
+
+    restarted = autoscaler([busy, own], state_file)
+    actions = restarted.step()
+    assert actions == [CloseInstance(own, 0.0)]
+    assert restarted.service.closed == [own]
+    assert autoscaler([busy], state_file)._created == {}
+
+
+def test_dry_run_does_not_record(tmp_path):
+    state_file = tmp_path / "state.json"
+    scaler = autoscaler([], state_file, created=SimpleNamespace(id="x"), dry_run=True)
+    scaler.step()
+    assert not state_file.exists()
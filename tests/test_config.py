@@ -0,0 +1,18 @@
+from pathlib import Path
+
+from app.config import Config
+
+
+def test_history_db_path_from_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("HISTORY_DB", str(tmp_path / "h.sqlite3"))
+    assert Config.history_db_path() == tmp_path / "h.sqlite3"
+
+
+def test_history_db_path_disabled(monkeypatch):
+    monkeypatch.setenv("HISTORY_DB", "")
+    assert Config.history_db_path() is None
+
+
+def test_history_db_path_default(monkeypatch):
+    monkeypatch.delenv("HISTORY_DB", raising=False)
+    assert Config.history_db_path() == Path("data/history.sqlite3")
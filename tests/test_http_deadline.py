@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+import requests
+from urllib3.exceptions import MaxRetryError, ReadTimeoutError
+
+from app.task_scheduler import TaskScheduler
+from app.util.http import DeadlineExceeded, EndpointClass, HttpClient
+
+URL = "https://api.vrchat.cloud/api/1/users/usr_x"
+
+
+def test_deadline_is_per_thread():
+    http = HttpClient()
+    inside = threading.Event()
+    release = threading.Event()
+    seen = []
+
+    def other():
+        seen.append(http.remaining())
+        with http.deadline(100):
+            inside.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=other)
+    with http.deadline(1):
+        thread.start()
+        inside.wait(5)
+        # 他スレッドの期限で上書きされない
+        assert http.remaining() <= 1
+        release.set()
+        thread.join()
+    assert seen == [None]
+    assert http.remaining() is None
+
+
+def test_parallel_worker_keeps_budget_after_deadline_exits():
+    http = HttpClient()
+    started = threading.Event()
+    release = threading.Event()
+    remaining = []
+
+    def slow():
+        started.set()
+        release.wait(5)
+        remaining.append(http.remaining())
+
+    tasks = TaskScheduler()
+    tasks.register("slow", slow, interval=60)
+    with http.deadline(0.5):
+        assert tasks.run_parallel(["slow"], timeout=0) == ["slow"]
+        started.wait(5)
+    release.set()
+    time.sleep(0.1)
+    tasks.shutdown()
+
+    # ブロックを抜けた後もワーカーは呼び出し元の期限で打ち切られる
+    assert remaining and remaining[0] is not None and remaining[0] < 0.5
+
+
+def test_exhausted_budget_raises():
+    http = HttpClient()
+    with http.deadline(0):
+        with pytest.raises(DeadlineExceeded):
+            http.request_timeout("GET", URL, EndpointClass.API)
+
+
+def test_retried_read_timeout_is_counted(monkeypatch):
+    http = HttpClient()
+
+    def timed_out(*args, **kwargs):
+        reason = ReadTimeoutError(None, URL, "Read timed out.")
+        raise requests.ConnectionError(MaxRetryError(None, URL, reason))
+
+    monkeypatch.setattr(http.session, "request", timed_out)
+    with pytest.raises(requests.ConnectionError):
+        http.request("GET", URL)
+    assert http.stats.get("timeouts") == 1
+
+
+def test_connection_refused_is_not_a_timeout(monkeypatch):
+    http = HttpClient()
+
+    def refused(*args, **kwargs):
+        raise requests.ConnectionError("Connection refused")
+
+    monkeypatch.setattr(http.session, "request", refused)
+    with pytest.raises(requests.ConnectionError):
+        http.request("GET", URL)
+    assert http.stats.get("timeouts") == 0
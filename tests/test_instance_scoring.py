@@ -0,0 +1,107 @@
+import math
+from datetime import datetime, timezone
+import random
+
+import pytest
+
+from app import instance_scoring
+from app.instance_scoring import VECTORIZE_MIN, InstanceScorer, ScoreWeights
+from app.model.snapshot import InstanceIndex
+from tests.factory import make_instance
+
+NOW = 1_750_000_000.0
+
+
+def clock() -> float:
+    return NOW
+
+
+def test_numpy_matches_python(monkeypatch):
+    rng = random.Random(0)
+    n = VECTORIZE_MIN * 2
+    args = (
+        [rng.randint(0, 80) for _ in range(n)],
+        [80] * n,
+        [rng.randint(0, 20) for _ in range(n)],
+        [rng.choice([math.inf, -60.0, 0.0, rng.uniform(0, 3600)]) for _ in range(n)],
+    )
+    scorer = InstanceScorer(ScoreWeights(headroom=0.1))
+
+    vectorized = scorer.score(*args)
+    monkeypatch.setattr(instance_scoring, "VECTORIZE_MIN", n + 1)
+    assert scorer.score(*args) == pytest.approx(vectorized)
+
+
+@pytest.mark.parametrize(
+    "closes_in, penalty",
+    [(math.inf, 0.0), (3600, 0.0), (1800, 0.0), (900, 0.5), (0, 1.0), (-60, 1.0)],
+)
+def test_closing_ramp(closes_in, penalty):
+    weights = ScoreWeights(population=0, queue=0, closing=-10, closing_window=1800)
+    scorer = InstanceScorer(weights)
+    assert scorer.score([0], [80], [0], [closes_in]) == [pytest.approx(-10 * penalty)]
+
+
+def test_closing_without_window():
+    scorer = InstanceScorer(ScoreWeights(population=0, closing_window=0))
+    assert scorer.score([0, 0], [80, 80], [0, 0], [1, 0]) == [0.0, -10.0]
+
+
+def test_closing_from_closed_at():
+    scorer = InstanceScorer(ScoreWeights(population=0, queue=0), clock=clock)
+    instances = [
+        make_instance(1, 10),
+        make_instance(2, 10, closes_at=NOW + 900),
+        make_instance(3, 10, closes_at=NOW - 60),
+    ]
+    assert scorer.score_instances(instances) == pytest.approx([0.0, -5.0, -10.0])
+
+
+def test_queue_disabled_ignores_queue_size():
+    scorer = InstanceScorer(clock=clock)
+    enabled, disabled = scorer.score_instances(
+        [
+            make_instance(1, 40, queue=20, queue_enabled=True),
+            make_instance(2, 40, queue=20, queue_enabled=False),
+        ]
+    )
+    assert enabled == 20
+    assert disabled == 40
+
+
+def test_population_only_matches_user_count_order():
+    rng = random.Random(1)
+    instances = [
+        make_instance(
+            no,
+            rng.randint(0, 80),
+            queue=rng.randint(0, 10),
+            closes_at=rng.choice([None, NOW + 600]),
+        )
+        for no in range(1, 31)
+    ]
+    weights = ScoreWeights(population=1, headroom=0, queue=0, closing=0)
+    ranked = [i for i, _ in InstanceScorer(weights, clock=clock).rank(instances)]
+    assert ranked == sorted(instances, key=lambda i: -i.user_count)
+
+
+def test_scheduled_close_reaches_scorer():
+    # クローズ予定のインスタンスも候補に残り、クローズが近いほど順位が下がる
+    index = InstanceIndex(
+        [
+            make_instance(1, 40, closes_at=NOW + 60),
+            make_instance(2, 35),
+            make_instance(3, 50, closes_at=NOW - 60),
+        ],
+        now=datetime.fromtimestamp(NOW, timezone.utc),
+    )
+    closing, open_, closed = index
+    assert index.by_population == (closing, open_)
+    assert not index.is_open(closed)
+
+    scorer = InstanceScorer(clock=clock)
+    assert scorer.best(index.by_population) is open_
+    assert (
+        InstanceScorer(ScoreWeights(closing=0), clock=clock).best(index.by_population)
+        is closing
+    )
@@ -0,0 +1,71 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.instance_scoring import InstanceScorer, ScoreWeights
+from app.model.snapshot import InstanceIndex
+from app.populate_monitor import PopulationMonitor
+from tests.factory import make_instance
+
+
+class DummyPatlite:
+    def __init__(self) -> None:
+        self.calls = []
+
+    def control(self, options) -> None:
+        self.calls.append(options)
+
+
+def evaluate(instances, current, threshold=8, weights=ScoreWeights()):
+    monitor = PopulationMonitor(
+        DummyPatlite(), threshold=threshold, scorer=InstanceScorer(weights)
+    )
+    user = SimpleNamespace(location=current.location)
+    return monitor.evaluate(InstanceIndex(instances), user), monitor.pl_api
+
+
+@pytest.mark.parametrize("users, expected", [(40, True), (33, True), (32, False)])
+def test_threshold_on_score_difference(users, expected):
+    current = make_instance(1, users)
+    other = make_instance(2, 40)
+    ok, patlite = evaluate([current, other], current)
+    assert ok is expected
+    assert len(patlite.calls) == (0 if expected else 1)
+
+
+def test_threshold_includes_queue_of_target():
+    # 待機列を減点すると移動先のスコアは 45 - 15 = 30 で差は閾値未満
+    current = make_instance(1, 20)
+    other = make_instance(2, 45, queue=15)
+    assert evaluate([current, other], current, threshold=12)[0] is True
+    assert (
+        evaluate(
+            [current, other], current, threshold=12, weights=ScoreWeights(queue=0)
+        )[0]
+        is False
+    )
+
+
+def test_own_queue_does_not_penalize_current_instance():
+    # 滞在中のインスタンスの待機列で自分が最大から外れたと判定しない
+    current = make_instance(1, 40, queue=20)
+    other = make_instance(2, 30)
+    assert evaluate([current, other], current, threshold=1)[0] is True
+
+
+def test_own_closing_does_not_penalize_current_instance():
+    current = make_instance(1, 40, closes_at=0)
+    other = make_instance(2, 35)
+    assert evaluate([current, other], current, threshold=1)[0] is True
+
+
+def test_closing_penalty_applies_to_scheduled_close():
+    # クローズ予定(15分後)の移動先は半分だけ減点され、差が閾値未満になる
+    current = make_instance(1, 30)
+    closing = make_instance(2, 40, closes_at=time.time() + 900)
+    assert evaluate([current, closing], current)[0] is True
+    assert (
+        evaluate([current, closing], current, weights=ScoreWeights(closing=0))[0]
+        is False
+    )
@@ -0,0 +1,51 @@
+from app.population_rollup import RESOLUTIONS, aggregate, bucket_start
+
+# 日本時間の0時ちょうど
+T0 = 1_750_000_000 - (1_750_000_000 + 9 * 3600) % 86400
+
+
+def test_aggregate_min_max_sum_and_top():
+    rows = [
+        # (ts, instance, users, closed)
+        (T0, 1, 10, False),
+        (T0, 2, 12, False),
+        (T0, 3, 30, True),  # クローズ済みは最大インスタンスにしない
+        (T0 + 60, 1, 14, False),
+        (T0 + 60, 2, 12, False),
+        (T0 + 300, 1, 20, False),
+    ]
+    ts, instance, users, closed = zip(*rows)
+    aggregates, ticks = aggregate(list(ts), list(instance), list(users), list(closed))
+
+    assert aggregates[(300, T0, 1)] == [2, 10, 14, 24, 1]
+    assert aggregates[(300, T0, 2)] == [2, 12, 12, 24, 1]
+    assert aggregates[(300, T0, 3)] == [1, 30, 30, 30, 0]
+    assert aggregates[(300, T0 + 300, 1)] == [1, 20, 20, 20, 1]
+    assert aggregates[(3600, T0, 1)] == [3, 10, 20, 44, 2]
+    assert aggregates[(86400, T0, 2)] == [2, 12, 12, 24, 1]
+
+    assert ticks == {
+        (300, T0): 2,
+        (300, T0 + 300): 1,
+        (3600, T0): 3,
+        (86400, T0): 3,
+    }
+
+
+def test_aggregate_ties_go_to_lower_instance():
+    aggregates, _ = aggregate([T0, T0], [2, 1], [10, 10], [False, False])
+    assert aggregates[(300, T0, 1)][4] == 1
+    assert aggregates[(300, T0, 2)][4] == 0
+
+
+def test_buckets_follow_jst_days():
+    ts = T0 - 1
+    aggregates, _ = aggregate([ts], [1], [5], [False])
+    assert {k[:2] for k in aggregates} == {
+        (r, bucket_start(ts, r)) for r in RESOLUTIONS
+    }
+    assert bucket_start(ts, 86400) == T0 - 86400
+
+
+def test_aggregate_empty():
+    assert aggregate([], [], [], []) == ({}, {})
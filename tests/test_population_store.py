@@ -0,0 +1,94 @@
+import sqlite3
+from datetime import datetime, timezone
+
+from app.model.snapshot import InstanceIndex
+from app.population_rollup import ROLLUP_SCHEMA
+from app.population_store import PopulationStore
+from tests.factory import make_instance
+
+NOW = 1_750_000_000
+AT = datetime.fromtimestamp(NOW, timezone.utc)
+
+OLD_SCHEMA = """
+CREATE TABLE instances (
+    id INTEGER PRIMARY KEY,
+    instance_id TEXT NOT NULL UNIQUE,
+    world_id TEXT NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE TABLE samples (
+    instance INTEGER NOT NULL REFERENCES instances(id),
+    ts INTEGER NOT NULL,
+    users INTEGER NOT NULL,
+    queue INTEGER NOT NULL,
+    closed INTEGER NOT NULL,
+    PRIMARY KEY (instance, ts)
+) WITHOUT ROWID;
+"""
+
+
+def test_records_capacity_and_closes_at(tmp_path):
+    store = PopulationStore(tmp_path / "history.sqlite3", clock=lambda: NOW)
+    scheduled = make_instance(1, 10, capacity=40, closes_at=NOW + 600)
+    closed = make_instance(2, 5, closes_at=NOW - 60)
+    store.record(InstanceIndex([scheduled, closed], now=AT))
+    store.close()
+
+    # クローズ予定のものは記録時点ではオープン中
+    (sample,) = store.population(scheduled.instance_id, NOW - 1, NOW + 1)
+    assert (sample.capacity, sample.closes_at, sample.closed) == (40, NOW + 600, False)
+    (sample,) = store.population(closed.instance_id, NOW - 1, NOW + 1)
+    assert (sample.closes_at, sample.closed) == (NOW - 60, True)
+
+
+def test_migrates_samples_without_capacity(tmp_path):
+    path = tmp_path / "history.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.executescript(OLD_SCHEMA + ROLLUP_SCHEMA)
+    conn.execute("INSERT INTO instances VALUES (1, 'old', 'wrld', 'old')")
+    conn.execute("INSERT INTO samples VALUES (1, ?, 10, 0, 0)", (NOW - 60,))
+    conn.commit()
+    conn.close()
+
+    store = PopulationStore(path, clock=lambda: NOW)
+    store.record(InstanceIndex([make_instance(1, 20)], now=AT))
+    store.close()
+
+    (old,) = store.population("old", NOW - 120, NOW)
+    assert (old.users, old.capacity, old.closes_at) == (10, None, None)
+    assert [s.capacity for s in store.most_populated(NOW - 1, NOW + 1)] == [80]
+
+
+def rollups(path):
+    conn = sqlite3.connect(path)
+    try:
+        return (
+            sorted(conn.execute("SELECT * FROM rollups").fetchall()),
+            sorted(conn.execute("SELECT * FROM rollup_ticks").fetchall()),
+        )
+    finally:
+        conn.close()
+
+
+def test_replaced_samples_update_rollups(tmp_path):
+    replaced = tmp_path / "replaced.sqlite3"
+    store = PopulationStore(replaced, clock=lambda: NOW)
+    a, b = make_instance(1, 10), make_instance(2, 15)
+    store.record(InstanceIndex([a, b], now=AT), ts=NOW)
+    store.record(InstanceIndex([a, b], now=AT), ts=NOW + 60)
+    store.flush()
+
+    # 同じ時刻の記録を置き換えると最大人数・最大インスタンスも変わる
+    a = make_instance(1, 30)
+    store.record(InstanceIndex([a, b], now=AT), ts=NOW)
+    store.close()
+
+    direct = tmp_path / "direct.sqlite3"
+    store = PopulationStore(direct, clock=lambda: NOW)
+    store.record(InstanceIndex([a, b], now=AT), ts=NOW)
+    store.record(InstanceIndex([make_instance(1, 10), b], now=AT), ts=NOW + 60)
+    store.close()
+
+    assert rollups(replaced) == rollups(direct)
+    row = next(r for r in rollups(replaced)[0] if r[0] == 300 and r[2] == 1)
+    assert row[3:] == (2, 10, 30, 40, 1)
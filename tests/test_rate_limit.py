@@ -0,0 +1,155 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+import requests
+
+from app.util.http import HttpClient
+from app.util.rate_limit import Priority, RateLimiter, parse_retry_after
+
+URL = "https://api.vrchat.cloud/api/1/users/usr_x"
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def limiter(clock, rate=1.0, burst=2, reserve=1, **kwargs) -> RateLimiter:
+    return RateLimiter({"users": (rate, burst)}, reserve=reserve, clock=clock, **kwargs)
+
+
+def test_tokens_refill_over_time():
+    clock = FakeClock()
+    rl = limiter(clock, rate=0.5, burst=2, reserve=0)
+    assert rl.acquire("users", timeout=0)
+    assert rl.acquire("users", timeout=0)
+    assert not rl.acquire("users", timeout=0)
+
+    clock.now += 1  # 0.5個分
+    assert not rl.acquire("users", timeout=0)
+    clock.now += 1
+    assert rl.acquire("users", timeout=0)
+
+    # 補充はバースト数で頭打ち
+    clock.now += 100
+    assert [rl.acquire("users", timeout=0) for _ in range(3)] == [True, True, False]
+
+
+def test_timeout_returns_false_without_waiting():
+    clock = FakeClock()
+    rl = limiter(clock, rate=0.1, burst=1, reserve=0)
+    assert rl.acquire("users", timeout=0)
+    # 次のトークンまで10秒かかるので5秒の予算では取得できない
+    assert rl.acquire("users", timeout=5) is False
+    assert clock.now == 1000.0
+
+
+def test_normal_priority_leaves_reserve_for_high():
+    clock = FakeClock()
+    rl = limiter(clock, rate=1, burst=2, reserve=1)
+    assert rl.acquire("users", Priority.NORMAL, timeout=0)
+    # 残り1個は優先度の高いリクエスト用
+    assert not rl.acquire("users", Priority.NORMAL, timeout=0)
+    assert rl.acquire("users", Priority.HIGH, timeout=0)
+
+
+def test_normal_yields_to_waiting_high():
+    clock = FakeClock()
+    rl = limiter(clock, rate=20, burst=1, reserve=0)
+    assert rl.acquire("users", Priority.HIGH, timeout=0)
+
+    acquired = threading.Event()
+
+    def high():
+        rl.acquire("users", Priority.HIGH)
+        acquired.set()
+
+    thread = threading.Thread(target=high)
+    thread.start()
+    try:
+        while rl._waiting[Priority.HIGH] == 0:
+            threading.Event().wait(0.01)
+        clock.now += 1  # トークンは補充済みでも待機中の高優先度が先
+        assert not rl.acquire("users", Priority.NORMAL, timeout=0)
+        assert acquired.wait(2)
+    finally:
+        thread.join(2)
+
+
+def test_cooldown_blocks_all_families():
+    clock = FakeClock()
+    rl = limiter(clock, default_cooldown=60)
+    rl.cooldown(30)
+    assert rl.cooldown_remaining() == 30
+    assert not rl.acquire("users", timeout=10)
+    assert not rl.acquire("instances", Priority.HIGH, timeout=10)
+    clock.now += 30
+    assert rl.acquire("instances", timeout=0)
+
+    # Retry-Afterがなければ既定の秒数
+    assert rl.cooldown(None) == 60
+    # 短いクールダウンで長いものを縮めない
+    rl.cooldown(5)
+    assert rl.cooldown_remaining() == 60
+
+
+def test_parse_retry_after_seconds():
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after(" 7 ") == 7
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+
+
+def test_parse_retry_after_http_date():
+    at = datetime.now(timezone.utc) + timedelta(seconds=120)
+    assert parse_retry_after(format_datetime(at, usegmt=True)) == pytest.approx(
+        120, abs=2
+    )
+    past = datetime.now(timezone.utc) - timedelta(seconds=60)
+    assert parse_retry_after(format_datetime(past, usegmt=True)) == 0
+
+
+def response(status: int, retry_after: str = None) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status
+    resp.url = URL
+    if retry_after is not None:
+        resp.headers["Retry-After"] = retry_after
+    return resp
+
+
+def client(responses, monkeypatch):
+    clock = FakeClock()
+    http = HttpClient(rate_limiter=limiter(clock, reserve=0, burst=10))
+    cooldowns = []
+    original = http.rate_limiter.cooldown
+
+    def cooldown(seconds):
+        cooldowns.append(seconds)
+        return original(0)
+
+    monkeypatch.setattr(http.rate_limiter, "cooldown", cooldown)
+    monkeypatch.setattr(http.session, "request", lambda *a, **kw: responses.pop(0))
+    return http, cooldowns
+
+
+def test_request_retries_after_429(monkeypatch):
+    http, cooldowns = client([response(429, "5"), response(200)], monkeypatch)
+    assert http.request("GET", URL).status_code == 200
+    assert cooldowns == [5]
+    assert http.stats.get("rate_limited") == 1
+    assert http.stats.get("requests") == 2
+
+
+def test_request_gives_up_after_max_retries(monkeypatch):
+    responses = [response(429) for _ in range(3)]
+    http, cooldowns = client(responses, monkeypatch)
+    with pytest.raises(requests.HTTPError):
+        http.request("GET", URL)
+    assert cooldowns == [None, None, None]
+    assert http.stats.get("requests") == 3
@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+
+from app.travelling_monitor import TravelingMonitor
+
+
+class DummyPatlite:
+    def __init__(self) -> None:
+        self.calls = []
+
+    def control(self, options) -> None:
+        self.calls.append(options)
+
+
+def test_timeout_fires_once_per_timeout():
+    now = 0.0
+    monitor = TravelingMonitor(DummyPatlite(), timeout=180, clock=lambda: now)
+    traveling = SimpleNamespace(traveling_to_location="wrld:1")
+
+    fired = []
+    for now in range(0, 400, 10):
+        if monitor.check(traveling):
+            fired.append(now)
+
+    # 発火後は再びtimeout秒経過するまで再起動しない
+    assert fired == [180, 360]
+    assert len(monitor.pl_api.calls) == 2
+
+
+def test_arrival_resets_timer():
+    now = 0.0
+    monitor = TravelingMonitor(DummyPatlite(), timeout=180, clock=lambda: now)
+    traveling = SimpleNamespace(traveling_to_location="wrld:1")
+    arrived = SimpleNamespace(traveling_to_location=None)
+
+    assert monitor.check(traveling) is False
+    now = 170
+    assert monitor.check(arrived) is False
+    now = 200
+    assert monitor.check(traveling) is False
+    assert not monitor.pl_api.calls